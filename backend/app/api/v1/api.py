@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 
 from app.api.v1.endpoints import auth, users, products, categories, reviews, orders
-from app.api.v1.endpoints import auth_db, articulos, usuarios, pedidos
+from app.api.v1.endpoints import auth_db, articulos, usuarios, pedidos, reservas, stats
 
 api_router = APIRouter()
 
@@ -18,3 +18,5 @@ api_router.include_router(auth_db.router, prefix="/auth", tags=["auth"])
 api_router.include_router(articulos.router, prefix="/products", tags=["products"])
 api_router.include_router(usuarios.router, prefix="/users", tags=["users"])
 api_router.include_router(pedidos.router, prefix="/orders", tags=["orders"])
+api_router.include_router(reservas.router, prefix="/holds", tags=["holds"])
+api_router.include_router(stats.router, prefix="/stats", tags=["stats"])
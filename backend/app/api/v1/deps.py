@@ -7,8 +7,10 @@ from sqlmodel import Session, select
 from datetime import datetime, timedelta
 
 from app.core.config import settings
-from app.db.session import get_session
+from app.db.session import engine, get_session
 from app.models.db_models import Usuario
+from app.services.last_access import last_access_tracker
+from app.services.principal_cache import principal_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
@@ -28,35 +30,64 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)
-):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+def resolve_user(token: str, db: Session) -> Optional[Usuario]:
+    """
+    Resolver el usuario de un token JWT, usando la caché de principales si es posible.
+    Devuelve None si el token no es válido o el usuario no existe.
+    """
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached[1]
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
         email: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         
         if email is None or user_id is None:
-            raise credentials_exception
+            return None
             
         token_data = TokenData(email=email, user_id=user_id)
     except JWTError:
-        raise credentials_exception
-        
+        return None
+    
+    # Leer la generación antes de la consulta para no cachear datos ya invalidados
+    generation = principal_cache.generation(token_data.user_id)
     user = db.exec(select(Usuario).where(Usuario.email == token_data.email)).first()
     
+    if user is None:
+        return None
+    
+    if user.id == token_data.user_id:
+        principal_cache.set(token, payload, user, generation)
+    
+    return user
+
+def is_admin_token(token: str) -> bool:
+    """
+    Comprobar si un token JWT pertenece a un administrador activo, fuera de las
+    dependencias de FastAPI (middlewares).
+    """
+    with Session(engine) as db:
+        user = resolve_user(token, db)
+        return user is not None and user.activo and user.rol == "admin"
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_session)
+):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    user = resolve_user(token, db)
+    
     if user is None:
         raise credentials_exception
         
-    # Actualizar la fecha de último acceso
-    user.fecha_ultimo_acceso = datetime.utcnow()
-    db.commit()
+    # La fecha de último acceso se escribe en lote, fuera de la petición
+    last_access_tracker.touch(user.id)
     
     return user
 
@@ -1,40 +1,153 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+import csv
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from sqlalchemy import func
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 import os
 from datetime import datetime
 
+from app.db import search
 from app.db.session import get_session
-from app.models.db_models import ArticuloInventario, ArticuloCreate, ArticuloRead, ArticuloUpdate
+from app.api.v1.deps import get_current_admin_user
+from app.models.derived_fields import normalize_search_key
+from app.models.db_models import ArticuloInventario, ArticuloCreate, ArticuloRead, ArticuloUpdate, ImportacionResultado, Usuario
 from app.core.config import settings
+from app.services import catalog_import
+from app.services.catalog_cache import catalog_cache
+from app.services.fast_json import fast_json_response, model_columns, rows_to_dicts
+from app.services.file_upload import save_image_upload
+from app.services.image_variants import image_variant_generator, pick_variant
+from app.services.http_cache import is_not_modified, make_etag, not_modified_response, validator_headers
+from app.services.pagination import NEXT_CURSOR_HEADER, apply_keyset, decode_cursor, set_next_cursor
+from app.services.upload_store import register_upload, release_upload, retain_upload
 
 router = APIRouter()
 
+def _catalog_etag(db: Session, *params):
+    """
+    ETag del catálogo a partir de una única consulta de agregados, sin cargar
+    ninguna fila.
+    
+    No hay Last-Modified: ninguna fecha cambia al borrar un artículo, y los
+    recién creados no tienen fecha_actualizacion.
+    """
+    last_modified, total, max_id = db.exec(
+        select(
+            func.max(ArticuloInventario.fecha_actualizacion),
+            func.count(ArticuloInventario.id),
+            func.max(ArticuloInventario.id),
+        )
+    ).one()
+    return make_etag("list", last_modified, total, max_id, catalog_cache.version, params)
+
+# Columnas de ArticuloRead; sin imagen propia se devuelve la de respaldo,
+# calculada al guardar el artículo
+_READ_COLUMNS = model_columns(
+    ArticuloInventario,
+    ArticuloRead,
+    image_url=func.coalesce(ArticuloInventario.image_url, ArticuloInventario.fallback_image_url),
+)
+
+def _list_response(articulos, response: Response):
+    """
+    Las filas ya tienen la forma de ArticuloRead: con FAST_LIST_RESPONSES se
+    codifican directamente con orjson, sin volver a validarlas con Pydantic.
+    """
+    if settings.FAST_LIST_RESPONSES:
+        return fast_json_response(articulos, response)
+    return articulos
+
 @router.get("/", response_model=List[ArticuloRead])
 def get_articulos(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
     nombre: Optional[str] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    w: Optional[int] = Query(None, gt=0, description="Ancho en píxeles con el que se mostrará la imagen"),
     db: Session = Depends(get_session)
 ):
     """
-    Obtener lista de productos/artículos.
+    Obtener lista de productos/artículos ordenada por id.
+    
+    Si la página está completa, la cabecera `X-Next-Cursor` trae el cursor de la
+    siguiente página; con `cursor` se ignora `skip`.
+    
+    Con `q` se hace una búsqueda de texto completo (prefijos) sobre nombre y
+    descripción, ordenada por relevancia y paginada con skip/limit.
+    
+    Con `w`, `image_url` apunta a la versión WebP más pequeña de al menos `w`
+    píxeles de ancho, si la imagen ya tiene versiones generadas.
+    
+    Responde 304 si `If-None-Match` sigue siendo válido.
     """
-    query = select(ArticuloInventario)
+    match = search.build_match_query(q) if q else None
+    if q and not match:
+        # Una búsqueda sin palabras (p. ej. solo signos) no encuentra nada;
+        # sin filtro devolvería el catálogo completo
+        return []
     
-    if nombre:
-        query = query.where(ArticuloInventario.nombre.contains(nombre))
+    cache_key = catalog_cache.list_key(
+        skip=0 if cursor and not match else skip,
+        limit=limit,
+        nombre=nombre,
+        q=match,
+        cursor=None if match else cursor,
+        w=w,
+    )
     
-    articulos = db.exec(query.offset(skip).limit(limit)).all()
+    etag = _catalog_etag(db, cache_key)
+    headers = validator_headers(etag)
+    if is_not_modified(request, etag):
+        return not_modified_response(headers)
+    response.headers.update(headers)
     
-    # Añadir URLs de imágenes generadas para cada artículo si no tienen
-    for articulo in articulos:
-        if not articulo.image_url:
-            # Generamos URLs de imágenes de Unsplash basadas en el nombre del producto
-            query_term = articulo.nombre.split()[0].lower()
-            articulo.image_url = f"https://source.unsplash.com/featured/?{query_term}&tech"
+    cached = catalog_cache.get(cache_key, etag)
+    if cached is not None:
+        articulos, next_cursor = cached
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return _list_response(articulos, response)
+    cache_version = catalog_cache.version
     
-    return articulos
+    # Solo las columnas de ArticuloRead, como filas simples: sin objetos ORM
+    query = select(*_READ_COLUMNS)
+    
+    if nombre:
+        # Sin distinguir mayúsculas ni acentos. Es una subcadena (LIKE '%x%'): con el
+        # comodín inicial no se usa el índice y se recorre la tabla; `q` usa FTS5
+        query = query.where(ArticuloInventario.search_key.contains(normalize_search_key(nombre)))
+    
+    next_cursor = None
+    if match and search.fts_enabled:
+        ranking = search.search_ranking(match)
+        query = query.join(ranking, ranking.c.rowid == ArticuloInventario.id)
+        query = query.order_by(ranking.c.rank, ArticuloInventario.id).offset(skip)
+        articulos = rows_to_dicts(db.execute(query.limit(limit)).all())
+    else:
+        if match:
+            # Sin FTS5 disponible: cada palabra debe aparecer en el nombre
+            for word in normalize_search_key(q).split():
+                query = query.where(ArticuloInventario.search_key.contains(word))
+        
+        cursor_values = decode_cursor(cursor, int) if cursor else None
+        query = apply_keyset(query, [ArticuloInventario.id], cursor_values)
+        if cursor_values is None:
+            query = query.offset(skip)
+        
+        articulos = rows_to_dicts(db.execute(query.limit(limit)).all())
+        next_cursor = set_next_cursor(response, articulos, limit, lambda articulo: (articulo["id"],))
+    
+    if w:
+        for articulo in articulos:
+            variant = pick_variant(articulo["image_variants"], w)
+            if variant:
+                articulo["image_url"] = variant["webp"]
+    catalog_cache.set(cache_key, (articulos, next_cursor), cache_version, etag)
+    return _list_response(articulos, response)
 
 @router.post("/", response_model=ArticuloRead)
 def create_articulo(
@@ -50,26 +163,83 @@ def create_articulo(
     db.add(db_articulo)
     db.commit()
     db.refresh(db_articulo)
+    catalog_cache.invalidate([db_articulo.id])
     return db_articulo
 
+@router.post("/import", response_model=ImportacionResultado)
+def import_articulos(
+    file: UploadFile = File(...),
+    clave: str = Query("nombre", regex="^(nombre|sku)$", description="Columna que identifica un artículo existente"),
+    formato: Optional[str] = Query(None, regex="^(csv|ndjson)$", description="Se deduce del nombre del archivo si no se indica"),
+    db: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_admin_user)
+):
+    """
+    Importar o actualizar productos en bloque desde un CSV o NDJSON.
+    El archivo se procesa fila a fila y se guarda en transacciones de
+    IMPORT_CHUNK_SIZE filas. Las filas no válidas se devuelven en el informe
+    de errores y no detienen la importación.
+    """
+    if formato is None:
+        nombre_archivo = (file.filename or "").lower()
+        if nombre_archivo.endswith((".ndjson", ".jsonl")) or file.content_type in ("application/x-ndjson", "application/jsonl"):
+            formato = "ndjson"
+        else:
+            formato = "csv"
+    
+    if formato == "ndjson":
+        rows = catalog_import.iter_ndjson_rows(file.file)
+    else:
+        rows = catalog_import.iter_csv_rows(file.file)
+    try:
+        resultado = catalog_import.import_articulos(db, rows, key=clave)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"No se pudo leer el archivo: {e}")
+    finally:
+        # Cualquier bloque ya guardado cambia el catálogo, aunque la importación falle después
+        catalog_cache.clear()
+    return resultado
+
 @router.get("/{articulo_id}", response_model=ArticuloRead)
 def get_articulo(
     articulo_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_session)
 ):
     """
     Obtener un producto/artículo específico por su ID.
+    
+    Responde 304 si `If-None-Match` o `If-Modified-Since` siguen siendo válidos.
     """
-    articulo = db.get(ArticuloInventario, articulo_id)
-    if not articulo:
+    fechas = db.exec(
+        select(ArticuloInventario.fecha_creacion, ArticuloInventario.fecha_actualizacion)
+        .where(ArticuloInventario.id == articulo_id)
+    ).first()
+    if not fechas:
         raise HTTPException(status_code=404, detail="Artículo no encontrado")
     
-    if not articulo.image_url:
-        # Generamos URL de imagen de Unsplash basada en el nombre del producto
-        query_term = articulo.nombre.split()[0].lower()
-        articulo.image_url = f"https://source.unsplash.com/featured/?{query_term}&tech"
+    fecha_creacion, fecha_actualizacion = fechas
+    last_modified = fecha_actualizacion or fecha_creacion
+    etag = make_etag("item", articulo_id, fecha_creacion, fecha_actualizacion)
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+    
+    cache_key = catalog_cache.item_key(articulo_id)
+    cached = catalog_cache.get(cache_key, etag)
+    if cached is not None:
+        return cached
+    cache_version = catalog_cache.version
     
-    return articulo
+    articulo = db.execute(select(*_READ_COLUMNS).where(ArticuloInventario.id == articulo_id)).first()
+    if not articulo:
+        raise HTTPException(status_code=404, detail="Artículo no encontrado")
+    
+    result = dict(articulo._mapping)
+    catalog_cache.set(cache_key, result, cache_version, etag)
+    return result
 
 @router.put("/{articulo_id}", response_model=ArticuloRead)
 def update_articulo(
@@ -86,14 +256,24 @@ def update_articulo(
     
     articulo_data = articulo_update.dict(exclude_unset=True)
     
+    image_changed = "image_url" in articulo_data and articulo_data["image_url"] != db_articulo.image_url
+    if image_changed:
+        release_upload(db, db_articulo.image_url)
+        retain_upload(db, articulo_data["image_url"])
     for key, value in articulo_data.items():
         setattr(db_articulo, key, value)
+    if image_changed:
+        # Las versiones de la imagen anterior ya no sirven
+        db_articulo.image_variants = None
     
     db_articulo.fecha_actualizacion = datetime.utcnow()
     
     db.add(db_articulo)
     db.commit()
     db.refresh(db_articulo)
+    catalog_cache.invalidate([articulo_id])
+    if image_changed and db_articulo.image_url:
+        image_variant_generator.submit_articulo(articulo_id, db_articulo.image_url)
     return db_articulo
 
 @router.delete("/{articulo_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -108,10 +288,36 @@ def delete_articulo(
     if not db_articulo:
         raise HTTPException(status_code=404, detail="Artículo no encontrado")
     
+    release_upload(db, db_articulo.image_url)
     db.delete(db_articulo)
     db.commit()
+    catalog_cache.invalidate([articulo_id])
     return None
 
+def _apply_image(db: Session, articulo_id: int, image_url: str):
+    """
+    Asignar a un artículo una imagen ya guardada y registrada. Devuelve el
+    artículo y si la imagen ha cambiado.
+    """
+    db_articulo = db.get(ArticuloInventario, articulo_id)
+    if not db_articulo:
+        raise HTTPException(status_code=404, detail="Artículo no encontrado")
+    
+    if db_articulo.image_url == image_url:
+        # La misma imagen otra vez: no hay nada que cambiar
+        return db_articulo, False
+    
+    release_upload(db, db_articulo.image_url)
+    retain_upload(db, image_url)
+    db_articulo.image_url = image_url
+    db_articulo.image_variants = None
+    db_articulo.fecha_actualizacion = datetime.utcnow()
+    
+    db.add(db_articulo)
+    db.commit()
+    db.refresh(db_articulo)
+    return db_articulo, True
+
 @router.post("/{articulo_id}/upload-image", response_model=ArticuloRead)
 async def upload_image(
     articulo_id: int,
@@ -121,35 +327,26 @@ async def upload_image(
     """
     Subir una imagen para un producto/artículo.
     """
-    db_articulo = db.get(ArticuloInventario, articulo_id)
-    if not db_articulo:
+    # Todo el acceso a la base de datos va al threadpool: puede esperar al busy_timeout
+    if await run_in_threadpool(db.get, ArticuloInventario, articulo_id) is None:
         raise HTTPException(status_code=404, detail="Artículo no encontrado")
     
-    # Verificar que sea una imagen
-    content_type = file.content_type
-    if not content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
+    def registrar(name: str, sha256: str, size: int) -> None:
+        # Antes de reutilizar un archivo idéntico ya guardado, para que el
+        # recolector de subidas no lo borre entre medias
+        register_upload(db, sha256, f"/static/{settings.UPLOAD_FOLDER}/{name}", size)
+        db.commit()
     
-    # Crear directorio si no existe
+    # Guardar la imagen por bloques con su SHA-256 como nombre; el formato se
+    # detecta por su contenido y no por el content_type que envía el cliente
     upload_dir = os.path.join(settings.STATIC_PATH, settings.UPLOAD_FOLDER)
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Guardar la imagen
-    file_ext = os.path.splitext(file.filename)[1]
-    file_name = f"product_{articulo_id}_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}{file_ext}"
-    file_path = os.path.join(upload_dir, file_name)
-    
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    stored = await save_image_upload(file, upload_dir, registrar)
+    image_url = f"/static/{settings.UPLOAD_FOLDER}/{stored.name}"
     
-    # Actualizar URL de la imagen
-    image_url = f"/static/{settings.UPLOAD_FOLDER}/{file_name}"
-    db_articulo.image_url = image_url
-    db_articulo.fecha_actualizacion = datetime.utcnow()
-    
-    db.add(db_articulo)
-    db.commit()
-    db.refresh(db_articulo)
+    db_articulo, changed = await run_in_threadpool(_apply_image, db, articulo_id, image_url)
+    if changed:
+        catalog_cache.invalidate([articulo_id])
+        # Las versiones redimensionadas se generan en segundo plano
+        image_variant_generator.submit_articulo(articulo_id, image_url)
     
     return db_articulo
@@ -1,34 +1,49 @@
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 from jose import jwt
 
-from app.core.security import verify_password, get_password_hash
 from app.core.config import settings
 from app.db.session import get_session
 from app.models.db_models import Usuario, Token
+from app.services.last_access import last_access_tracker
+from app.services.password_hashing import password_hasher
 
 router = APIRouter()
 
-def authenticate_user(db: Session, email: str, password: str) -> Usuario:
+def get_user_by_email(db: Session, email: str) -> Optional[Usuario]:
     """
-    Autenticar un usuario por email y contraseña
+    Buscar un usuario por email
     """
-    # Buscar el usuario por email
     query = select(Usuario).where(Usuario.email == email)
-    result = db.exec(query).first()
+    return db.exec(query).first()
+
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[Usuario]:
+    """
+    Autenticar un usuario por email y contraseña.
+    La verificación bcrypt se hace en el pool de procesos de hashing.
+    """
+    # Buscar el usuario por email
+    result = await run_in_threadpool(get_user_by_email, db, email)
     
     if not result:
         return None
     
-    if not verify_password(password, result.password_hash):
+    if not await password_hasher.verify(password, result.password_hash):
         return None
     
     return result
 
+def _create_user(db: Session, new_user: Usuario) -> Usuario:
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    return new_user
+
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     """
     Crear un token de acceso JWT
@@ -46,14 +61,14 @@ def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     return encoded_jwt
 
 @router.post("/login/access-token", response_model=Token)
-def login_access_token(
+async def login_access_token(
     db: Session = Depends(get_session),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     Obtener token JWT para acceso
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -68,10 +83,8 @@ def login_access_token(
             detail="Usuario inactivo"
         )
     
-    # Actualizar fecha del último acceso
-    user.fecha_ultimo_acceso = datetime.utcnow()
-    db.add(user)
-    db.commit()
+    # Actualizar fecha del último acceso (se escribe en lote)
+    last_access_tracker.touch(user.id)
     
     # Crear token JWT
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -84,7 +97,7 @@ def login_access_token(
     }
 
 @router.post("/register", response_model=Token)
-def register_user(
+async def register_user(
     *,
     db: Session = Depends(get_session),
     email: str,
@@ -96,8 +109,7 @@ def register_user(
     Registrar un nuevo usuario
     """
     # Verificar si el correo ya existe
-    query = select(Usuario).where(Usuario.email == email)
-    user = db.exec(query).first()
+    user = await run_in_threadpool(get_user_by_email, db, email)
     
     if user:
         raise HTTPException(
@@ -110,15 +122,13 @@ def register_user(
         email=email,
         nombre=nombre,
         apellidos=apellidos,
-        password_hash=get_password_hash(password),
+        password_hash=await password_hasher.hash(password),
         rol="cliente",
         activo=True,
         fecha_creacion=datetime.utcnow()
     )
     
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    new_user = await run_in_threadpool(_create_user, db, new_user)
     
     # Crear token JWT
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -0,0 +1,50 @@
+import os
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
+from app.services.file_upload import sniff_image_extension
+from app.services.http_cache import is_not_modified, make_etag, not_modified_response
+from app.services.image_resize import FORMATS, resized_image_cache
+from app.services.static_files import cache_control_for
+
+router = APIRouter()
+
+SOURCE_FORMATS = {".jpg": "jpeg", ".png": "png", ".gif": "png", ".webp": "webp"}
+
+@router.get("/{path:path}", response_class=FileResponse)
+async def get_imagen(
+    request: Request,
+    path: str,
+    w: Optional[int] = Query(None, gt=0, le=settings.IMAGE_RESIZE_MAX_DIMENSION),
+    h: Optional[int] = Query(None, gt=0, le=settings.IMAGE_RESIZE_MAX_DIMENSION),
+    fmt: Optional[str] = Query(None, regex="^(webp|jpeg|png)$"),
+):
+    """
+    Servir una imagen de /static redimensionada para caber en `w` x `h`
+    (nunca se amplía), opcionalmente convertida a `fmt`.
+    Las versiones generadas se guardan en una caché en disco.
+    
+    Solo los nombres con hash son inmutables; el resto se revalida con
+    `If-None-Match` y responde 304 sin volver a generar la imagen.
+    """
+    static_root = os.path.realpath(settings.STATIC_PATH)
+    source_path = os.path.realpath(os.path.join(static_root, path))
+    if not source_path.startswith(static_root + os.sep) or not os.path.isfile(source_path):
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    
+    with open(source_path, "rb") as source:
+        extension = sniff_image_extension(source.read(16))
+    if extension is None:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    fmt = fmt or SOURCE_FORMATS[extension]
+    
+    # La clave de la caché cambia con el tamaño y la fecha de la imagen original
+    etag = make_etag(resized_image_cache.key(source_path, w, h, fmt))
+    headers = {"ETag": etag, "Cache-Control": cache_control_for(source_path)}
+    if is_not_modified(request, etag):
+        return not_modified_response(headers)
+    
+    cached_path = await resized_image_cache.get(source_path, w, h, fmt)
+    return FileResponse(cached_path, media_type=FORMATS[fmt][2], headers=headers)
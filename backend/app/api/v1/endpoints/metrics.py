@@ -0,0 +1,51 @@
+import secrets
+from typing import Any, Dict, Iterator, Optional, Tuple
+import anyio.to_thread
+from fastapi import APIRouter, Header, HTTPException, Response, status
+
+from app.api.v1.endpoints.stats import collect_stats
+from app.core.config import settings
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, render_prometheus, request_metrics
+
+router = APIRouter()
+
+def _stat_gauges(stats: Dict[str, Dict[str, Any]]) -> Iterator[Tuple[str, str, float]]:
+    # Solo los valores numéricos de /api/v1/stats, como techstore_<componente>_<métrica>
+    for section, values in stats.items():
+        for name, value in values.items():
+            if isinstance(value, (bool, int, float)):
+                yield f"techstore_{section}_{name}", f"{section} {name} (see /api/v1/stats)", float(value)
+
+def _check_token(authorization: Optional[str]) -> None:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de métricas no válido",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """
+    Métricas en formato de texto de Prometheus: latencia por ruta, códigos de
+    estado, peticiones en curso y ocupación del threadpool.
+    
+    Con METRICS_TOKEN configurado, se exige como token Bearer y se añaden las
+    métricas de /api/v1/stats, que sin él solo ven los administradores.
+    """
+    if settings.METRICS_TOKEN:
+        _check_token(authorization)
+    
+    # El endpoint es async para leer el limitador del threadpool desde el event loop
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter_stats = limiter.statistics()
+    gauges = [
+        ("threadpool_capacity", "Threads available to sync endpoints", limiter_stats.total_tokens),
+        ("threadpool_busy", "Threads running sync endpoints", limiter_stats.borrowed_tokens),
+        ("threadpool_queue_depth", "Calls waiting for a free thread", limiter_stats.tasks_waiting),
+    ]
+    if settings.METRICS_TOKEN:
+        gauges.extend(_stat_gauges(collect_stats()))
+    body = render_prometheus(request_metrics.snapshot(), settings.METRICS_BUCKETS, gauges)
+    return Response(body, media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,16 +1,25 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+import csv
+import io
+import json
+from typing import Dict, Iterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 from datetime import datetime
 
-from app.db.session import get_session
+from app.db.session import engine, get_session
 from app.models.db_models import (
     Pedido, PedidoCreate, PedidoRead, 
     PedidoArticulo, PedidoArticuloCreate,
+    PedidoCheckout, PedidoConArticulosRead,
     ArticuloInventario
 )
-from app.api.v1.deps import get_current_user
+from app.api.v1.deps import get_current_user, get_current_admin_user
 from app.models.db_models import Usuario
+from app.services.catalog_cache import catalog_cache
+from app.services.inventory import get_available_stock, reserve_stock, reserve_stock_many
+from app.services.orders import create_order_with_lines
+from app.services.pagination import apply_keyset, decode_cursor, set_next_cursor
 
 router = APIRouter()
 
@@ -40,15 +49,102 @@ def create_pedido(
     
     return db_pedido
 
+@router.post("/checkout", response_model=PedidoConArticulosRead, status_code=status.HTTP_201_CREATED)
+def checkout_pedido(
+    checkout: PedidoCheckout,
+    db: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Crear un pedido completo con todas sus líneas en una sola transacción.
+    
+    Los artículos se cargan con una única consulta IN, el stock se reserva con
+    UPDATE condicionales, el total se calcula en el servidor con los precios
+    actuales y las líneas se insertan con executemany antes de un único commit.
+    """
+    usuario_id = checkout.usuario_id or current_user.id
+    if usuario_id != current_user.id and current_user.rol != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos para crear pedidos para otros usuarios"
+        )
+    
+    if not checkout.lineas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El pedido no tiene artículos"
+        )
+    
+    # Agrupar las líneas por artículo (la clave de pedido_articulos es pedido + artículo)
+    cantidades: Dict[int, int] = {}
+    for linea in checkout.lineas:
+        if linea.cantidad <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cantidad no válida para el artículo {linea.articulo_id}"
+            )
+        cantidades[linea.articulo_id] = cantidades.get(linea.articulo_id, 0) + linea.cantidad
+    
+    articulos = {
+        articulo.id: articulo
+        for articulo in db.exec(
+            select(ArticuloInventario).where(ArticuloInventario.id.in_(list(cantidades)))
+        ).all()
+    }
+    
+    faltan = [articulo_id for articulo_id in cantidades if articulo_id not in articulos]
+    if faltan:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Artículos no encontrados: {', '.join(map(str, faltan))}"
+        )
+    
+    ahora = datetime.utcnow()
+    
+    # Reservar el stock con UPDATE condicionales: sin sobreventa aunque haya pedidos concurrentes
+    sin_stock = reserve_stock_many(db, cantidades, ahora)
+    if sin_stock:
+        db.rollback()
+        disponibles = get_available_stock(db, sin_stock)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Stock insuficiente: " + "; ".join(
+                f"{articulos[articulo_id].nombre} (disponible: {disponibles.get(articulo_id, 0)})"
+                for articulo_id in sin_stock
+            )
+        )
+    
+    db_pedido, lineas = create_order_with_lines(
+        db,
+        usuario_id,
+        cantidades,
+        {articulo_id: articulo.precio for articulo_id, articulo in articulos.items()},
+        direccion_envio=checkout.direccion_envio,
+        notas=checkout.notas,
+        ahora=ahora,
+    )
+    
+    db.commit()
+    db.refresh(db_pedido)
+    catalog_cache.invalidate(cantidades)
+    
+    return PedidoConArticulosRead(**db_pedido.dict(), articulos=lineas)
+
 @router.get("/", response_model=List[PedidoRead])
 def get_pedidos(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
-    Obtener lista de pedidos. Si es admin, puede ver todos. Si es cliente, solo ve los suyos.
+    Obtener lista de pedidos, del más reciente al más antiguo. Si es admin, puede ver todos.
+    Si es cliente, solo ve los suyos.
+    
+    Si la página está completa, la cabecera `X-Next-Cursor` trae el cursor de la
+    siguiente página; con `cursor` se ignora `skip`.
     """
     query = select(Pedido)
     
@@ -56,9 +152,125 @@ def get_pedidos(
     if current_user.rol != "admin":
         query = query.where(Pedido.usuario_id == current_user.id)
     
-    pedidos = db.exec(query.offset(skip).limit(limit)).all()
+    cursor_values = decode_cursor(cursor, datetime.fromisoformat, int) if cursor else None
+    query = apply_keyset(query, [Pedido.fecha_pedido, Pedido.id], cursor_values, descending=True)
+    if cursor_values is None:
+        query = query.offset(skip)
+    
+    pedidos = db.exec(query.limit(limit)).all()
+    set_next_cursor(response, pedidos, limit, lambda pedido: (pedido.fecha_pedido, pedido.id))
     return pedidos
 
+_EXPORT_COLUMNS = [
+    "pedido_id", "usuario_id", "estado", "total", "fecha_pedido", "fecha_actualizacion",
+    "direccion_envio", "notas", "articulo_id", "articulo_nombre", "cantidad", "precio_unitario",
+]
+# Filas por lote leídas del cursor y bytes acumulados antes de enviar un trozo
+_EXPORT_BATCH_ROWS = 1000
+_EXPORT_CHUNK_BYTES = 64 * 1024
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _iter_export_rows(desde: Optional[datetime], hasta: Optional[datetime]) -> Iterator[tuple]:
+    """
+    Recorrer pedidos con sus líneas en orden de pedido, leyendo del cursor por
+    lotes (yield_per) en lugar de cargar todo con `.all()`.
+    """
+    query = (
+        select(
+            Pedido.id, Pedido.usuario_id, Pedido.estado, Pedido.total, Pedido.fecha_pedido,
+            Pedido.fecha_actualizacion, Pedido.direccion_envio, Pedido.notas,
+            PedidoArticulo.articulo_id, ArticuloInventario.nombre,
+            PedidoArticulo.cantidad, PedidoArticulo.precio_unitario,
+        )
+        .outerjoin(PedidoArticulo, PedidoArticulo.pedido_id == Pedido.id)
+        .outerjoin(ArticuloInventario, ArticuloInventario.id == PedidoArticulo.articulo_id)
+        .order_by(Pedido.id, PedidoArticulo.articulo_id)
+    )
+    if desde:
+        query = query.where(Pedido.fecha_pedido >= desde)
+    if hasta:
+        query = query.where(Pedido.fecha_pedido < hasta)
+    
+    # Sesión propia: la del endpoint puede cerrarse antes de terminar la respuesta
+    with Session(engine) as db:
+        result = db.execute(query.execution_options(yield_per=_EXPORT_BATCH_ROWS))
+        for row in result:
+            yield tuple(row)
+
+def _iter_export_ndjson(rows: Iterator[tuple]) -> Iterator[str]:
+    """
+    Un objeto JSON por pedido con sus líneas en `articulos`. Las filas llegan
+    ordenadas por pedido, así que solo se mantiene en memoria el pedido actual.
+    """
+    buffer = io.StringIO()
+    actual = None
+    
+    def cerrar(pedido):
+        buffer.write(json.dumps(pedido, ensure_ascii=False))
+        buffer.write("\n")
+    
+    for row in rows:
+        valores = dict(zip(_EXPORT_COLUMNS, map(_export_value, row)))
+        if actual is None or actual["pedido_id"] != valores["pedido_id"]:
+            if actual is not None:
+                cerrar(actual)
+                if buffer.tell() >= _EXPORT_CHUNK_BYTES:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            actual = {key: valores[key] for key in _EXPORT_COLUMNS[:8]}
+            actual["articulos"] = []
+        if valores["articulo_id"] is not None:
+            actual["articulos"].append({key: valores[key] for key in _EXPORT_COLUMNS[8:]})
+    
+    if actual is not None:
+        cerrar(actual)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _iter_export_csv(rows: Iterator[tuple]) -> Iterator[str]:
+    """
+    Una fila CSV por línea de pedido (los pedidos sin líneas salen con las
+    columnas de artículo vacías).
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(_EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([_export_value(value) for value in row])
+        if buffer.tell() >= _EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@router.get("/export")
+def export_pedidos(
+    formato: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    current_user: Usuario = Depends(get_current_admin_user)
+):
+    """
+    Exportar pedidos con sus líneas y artículos como NDJSON o CSV, en streaming.
+    `desde` (incluido) y `hasta` (excluido) filtran por fecha_pedido. Solo para administradores.
+    """
+    rows = _iter_export_rows(desde, hasta)
+    if formato == "csv":
+        content, media_type = _iter_export_csv(rows), "text/csv; charset=utf-8"
+    else:
+        content, media_type = _iter_export_ndjson(rows), "application/x-ndjson"
+    
+    filename = f"pedidos_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{formato}"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @router.get("/{pedido_id}", response_model=PedidoRead)
 def get_pedido(
     pedido_id: int,
@@ -108,25 +320,31 @@ def add_articulo_to_pedido(
     if not articulo:
         raise HTTPException(status_code=404, detail="Artículo no encontrado")
     
-    # Verificar stock disponible
-    if articulo.cantidad < pedido_articulo.cantidad:
+    if pedido_articulo.cantidad <= 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Stock insuficiente. Disponible: {articulo.cantidad}"
+            detail="La cantidad debe ser mayor que cero"
+        )
+    
+    # Reservar el stock con un UPDATE condicional: sin lectura previa que pueda quedar obsoleta
+    if not reserve_stock(db, articulo.id, pedido_articulo.cantidad):
+        db.rollback()
+        disponible = get_available_stock(db, [articulo.id]).get(articulo.id, 0)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stock insuficiente. Disponible: {disponible}"
         )
     
     # Crear la relación pedido-artículo
     db_pedido_articulo = PedidoArticulo.from_orm(pedido_articulo)
     
-    # Actualizar stock
-    articulo.cantidad -= pedido_articulo.cantidad
-    
     # Actualizar el total del pedido
     pedido.total += pedido_articulo.cantidad * pedido_articulo.precio_unitario
     pedido.fecha_actualizacion = datetime.utcnow()
     
     db.add(db_pedido_articulo)
     db.commit()
+    catalog_cache.invalidate([pedido_articulo.articulo_id])
     
     return pedido_articulo
 
@@ -0,0 +1,193 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import delete, func
+from sqlmodel import Session, select
+
+from app.db.session import get_session
+from app.models.db_models import (
+    ArticuloInventario, PedidoConArticulosRead,
+    ReservaInventario, ReservaCreate, ReservaRead, ReservaCheckout,
+    StockDisponibleRead, Usuario
+)
+from app.api.v1.deps import get_current_user
+from app.services.catalog_cache import catalog_cache
+from app.services.inventory import get_available_stock
+from app.services.orders import create_order_with_lines
+from app.services.reservations import reservation_manager
+
+router = APIRouter()
+
+@router.post("/", response_model=ReservaRead, status_code=status.HTTP_201_CREATED)
+def create_reserva(
+    reserva: ReservaCreate,
+    db: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Reservar unidades de un artículo durante un tiempo limitado (carrito).
+    El stock reservado deja de estar disponible para los demás hasta que la
+    reserva caduca, se cancela o se convierte en pedido.
+    """
+    if reserva.cantidad <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La cantidad debe ser mayor que cero"
+        )
+    
+    if not db.get(ArticuloInventario, reserva.articulo_id):
+        raise HTTPException(status_code=404, detail="Artículo no encontrado")
+    
+    db_reserva = reservation_manager.place(db, current_user.id, reserva.articulo_id, reserva.cantidad)
+    if db_reserva is None:
+        disponible = get_available_stock(db, [reserva.articulo_id]).get(reserva.articulo_id, 0)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Stock insuficiente. Disponible: {disponible}"
+        )
+    
+    return db_reserva
+
+@router.get("/", response_model=List[ReservaRead])
+def get_reservas(
+    db: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Obtener las reservas activas del usuario actual.
+    """
+    return db.exec(
+        select(ReservaInventario)
+        .where(ReservaInventario.usuario_id == current_user.id)
+        .where(ReservaInventario.fecha_expiracion > datetime.utcnow())
+        .order_by(ReservaInventario.fecha_expiracion)
+    ).all()
+
+@router.get("/articulos/{articulo_id}", response_model=StockDisponibleRead)
+def get_stock_disponible(
+    articulo_id: int,
+    db: Session = Depends(get_session)
+):
+    """
+    Stock disponible de un artículo y unidades reservadas en carritos.
+    `disponible` ya descuenta las reservas; `reservado` usa el índice por artículo.
+    """
+    cantidad = db.exec(
+        select(ArticuloInventario.cantidad).where(ArticuloInventario.id == articulo_id)
+    ).first()
+    if cantidad is None:
+        raise HTTPException(status_code=404, detail="Artículo no encontrado")
+    
+    reservado = db.exec(
+        select(func.coalesce(func.sum(ReservaInventario.cantidad), 0))
+        .where(ReservaInventario.articulo_id == articulo_id)
+    ).one()
+    
+    return StockDisponibleRead(articulo_id=articulo_id, disponible=cantidad, reservado=reservado)
+
+@router.delete("/{reserva_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_reserva(
+    reserva_id: int,
+    db: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Cancelar una reserva y devolver su stock.
+    """
+    reserva = db.get(ReservaInventario, reserva_id)
+    if not reserva:
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
+    
+    if current_user.rol != "admin" and reserva.usuario_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos para cancelar esta reserva"
+        )
+    
+    if not reservation_manager.release(db, reserva):
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
+    return None
+
+@router.post("/checkout", response_model=PedidoConArticulosRead, status_code=status.HTTP_201_CREATED)
+def checkout_reservas(
+    checkout: ReservaCheckout,
+    db: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Convertir reservas activas en un pedido. El stock ya está descontado, así
+    que solo se borran las reservas y se insertan las líneas del pedido.
+    """
+    ahora = datetime.utcnow()
+    query = (
+        select(ReservaInventario)
+        .where(ReservaInventario.usuario_id == current_user.id)
+        .where(ReservaInventario.fecha_expiracion > ahora)
+    )
+    if checkout.reservas is not None:
+        query = query.where(ReservaInventario.id.in_(checkout.reservas))
+    reservas = db.exec(query).all()
+    
+    if not reservas:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No hay reservas activas"
+        )
+    if checkout.reservas is not None and len(reservas) != len(set(checkout.reservas)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Alguna reserva no existe o ha caducado"
+        )
+    
+    reserva_ids = [reserva.id for reserva in reservas]
+    
+    # Borrado condicional: si el barrido de caducadas se adelantó, no se usa la reserva
+    tabla_reservas = ReservaInventario.__table__
+    result = db.execute(
+        delete(tabla_reservas)
+        .where(tabla_reservas.c.id.in_(reserva_ids))
+        .where(tabla_reservas.c.fecha_expiracion > ahora)
+    )
+    if result.rowcount != len(reserva_ids):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Alguna reserva ha caducado durante el pedido"
+        )
+    
+    cantidades: Dict[int, int] = defaultdict(int)
+    for reserva in reservas:
+        cantidades[reserva.articulo_id] += reserva.cantidad
+    
+    precios = dict(
+        db.exec(
+            select(ArticuloInventario.id, ArticuloInventario.precio)
+            .where(ArticuloInventario.id.in_(list(cantidades)))
+        ).all()
+    )
+    # Un artículo reservado puede haberse borrado del catálogo después
+    retirados = [articulo_id for articulo_id in cantidades if articulo_id not in precios]
+    if retirados:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Artículos retirados del catálogo: {', '.join(map(str, retirados))}"
+        )
+    
+    db_pedido, lineas = create_order_with_lines(
+        db,
+        current_user.id,
+        cantidades,
+        precios,
+        direccion_envio=checkout.direccion_envio,
+        notas=checkout.notas,
+        ahora=ahora,
+    )
+    
+    db.commit()
+    db.refresh(db_pedido)
+    reservation_manager.forget(reserva_ids)
+    catalog_cache.invalidate(cantidades)
+    
+    return PedidoConArticulosRead(**db_pedido.dict(), articulos=lineas)
@@ -0,0 +1,46 @@
+import os
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from app.api.v1.deps import get_current_admin_user
+from app.core.config import settings
+from app.core.metrics import request_metrics
+from app.db.slow_queries import slow_query_log
+from app.models.db_models import Usuario
+from app.services.catalog_cache import catalog_cache
+from app.services.image_resize import resized_image_cache
+from app.services.password_hashing import password_hasher
+from app.services.principal_cache import principal_cache
+
+router = APIRouter()
+
+def collect_stats() -> Dict[str, Dict[str, Any]]:
+    """Métricas internas de cada componente; también se exportan en /metrics"""
+    return {
+        "password_hashing": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "image_resize_cache": resized_image_cache.stats(),
+        "slow_queries": slow_query_log.stats(),
+    }
+
+@router.get("/")
+def get_stats(current_user: Usuario = Depends(get_current_admin_user)) -> Dict[str, Any]:
+    """
+    Métricas internas del proceso (pool de hashing, cachés, imágenes redimensionadas,
+    consultas lentas, latencia por ruta). Solo para administradores.
+    """
+    return dict(collect_stats(), http=request_metrics.stats())
+
+@router.get("/profiles/{nombre}", response_class=FileResponse)
+def get_profile(nombre: str, current_user: Usuario = Depends(get_current_admin_user)):
+    """
+    Descargar un perfil de una petición (cabecera X-Profile), en formato de pilas
+    colapsadas para flamegraph.pl o speedscope. Solo para administradores.
+    """
+    path = os.path.join(settings.PROFILE_PATH, os.path.basename(nombre))
+    if not nombre.endswith(".collapsed") or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    
+    return FileResponse(path, media_type="text/plain", filename=os.path.basename(nombre))
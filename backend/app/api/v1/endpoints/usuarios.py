@@ -1,32 +1,46 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime
 
 from app.db.session import get_session
 from app.models.db_models import Usuario, UsuarioCreate, UsuarioRead, UsuarioUpdate
-from app.core.security import get_password_hash, verify_password
 from app.api.v1.deps import get_current_user, get_current_admin_user
+from app.services.password_hashing import password_hasher
+from app.services.pagination import apply_keyset, decode_cursor, set_next_cursor
+from app.services.principal_cache import principal_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=List[UsuarioRead])
 def get_usuarios(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     nombre: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_admin_user)
 ):
     """
-    Obtener lista de usuarios. Solo disponible para administradores.
+    Obtener lista de usuarios ordenada por id. Solo disponible para administradores.
+    
+    Si la página está completa, la cabecera `X-Next-Cursor` trae el cursor de la
+    siguiente página; con `cursor` se ignora `skip`.
     """
     query = select(Usuario)
     
     if nombre:
         query = query.where(Usuario.nombre.contains(nombre) | Usuario.apellidos.contains(nombre))
     
-    usuarios = db.exec(query.offset(skip).limit(limit)).all()
+    cursor_values = decode_cursor(cursor, int) if cursor else None
+    query = apply_keyset(query, [Usuario.id], cursor_values)
+    if cursor_values is None:
+        query = query.offset(skip)
+    
+    usuarios = db.exec(query.limit(limit)).all()
+    set_next_cursor(response, usuarios, limit, lambda usuario: (usuario.id,))
     return usuarios
 
 @router.get("/me", response_model=UsuarioRead)
@@ -58,8 +72,26 @@ def get_usuario(
     
     return usuario
 
+def _apply_usuario_update(db: Session, usuario_id: int, usuario_data: dict) -> Usuario:
+    """
+    Aplicar los cambios ya preparados a un usuario y guardarlos.
+    """
+    usuario = db.get(Usuario, usuario_id)
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    
+    for key, value in usuario_data.items():
+        setattr(usuario, key, value)
+    
+    db.add(usuario)
+    db.commit()
+    db.refresh(usuario)
+    principal_cache.invalidate_user(usuario.id)
+    
+    return usuario
+
 @router.put("/me", response_model=UsuarioRead)
-def update_user_me(
+async def update_user_me(
     *,
     usuario_update: UsuarioUpdate,
     db: Session = Depends(get_session),
@@ -70,26 +102,20 @@ def update_user_me(
     """
     usuario_data = usuario_update.dict(exclude_unset=True)
     
-    # Si se proporciona contraseña, actualizarla
+    # Si se proporciona contraseña, actualizarla (bcrypt en el pool de procesos)
     if "password" in usuario_data:
-        usuario_data["password_hash"] = get_password_hash(usuario_data["password"])
+        usuario_data["password_hash"] = await password_hasher.hash(usuario_data["password"])
         del usuario_data["password"]
     
     # No permitir cambiar el rol desde aquí
     if "rol" in usuario_data:
         del usuario_data["rol"]
     
-    for key, value in usuario_data.items():
-        setattr(current_user, key, value)
-    
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-    
-    return current_user
+    # current_user puede venir de la caché y no estar asociado a esta sesión
+    return await run_in_threadpool(_apply_usuario_update, db, current_user.id, usuario_data)
 
 @router.put("/{usuario_id}", response_model=UsuarioRead)
-def update_usuario(
+async def update_usuario(
     *,
     usuario_id: int,
     usuario_update: UsuarioUpdate,
@@ -99,25 +125,18 @@ def update_usuario(
     """
     Actualizar los datos de un usuario. Solo disponible para administradores.
     """
-    usuario = db.get(Usuario, usuario_id)
-    if not usuario:
+    # Antes de ocupar el pool de bcrypt con un usuario que no existe
+    if await run_in_threadpool(db.get, Usuario, usuario_id) is None:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
     
     usuario_data = usuario_update.dict(exclude_unset=True)
     
-    # Si se proporciona contraseña, actualizarla
+    # Si se proporciona contraseña, actualizarla (bcrypt en el pool de procesos)
     if "password" in usuario_data:
-        usuario_data["password_hash"] = get_password_hash(usuario_data["password"])
+        usuario_data["password_hash"] = await password_hasher.hash(usuario_data["password"])
         del usuario_data["password"]
     
-    for key, value in usuario_data.items():
-        setattr(usuario, key, value)
-    
-    db.add(usuario)
-    db.commit()
-    db.refresh(usuario)
-    
-    return usuario
+    return await run_in_threadpool(_apply_usuario_update, db, usuario_id, usuario_data)
 
 @router.delete("/{usuario_id}", response_model=UsuarioRead)
 def delete_usuario(
@@ -142,5 +161,6 @@ def delete_usuario(
     
     db.delete(usuario)
     db.commit()
+    principal_cache.invalidate_user(usuario_id)
     
     return usuario
@@ -0,0 +1,194 @@
+import zlib
+from typing import Any, Callable, Optional, Set, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # In requirements.txt; without it only gzip is offered
+    brotli = None
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Bodies of these types are already compressed; doing it again only costs CPU
+SKIP_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-brotli",
+    "application/octet-stream",
+    "application/pdf",
+)
+
+
+def no_compression(endpoint: F) -> F:
+    """Route decorator: the CompressionMiddleware leaves its responses alone"""
+    endpoint.__no_compression__ = True
+    return endpoint
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content codings the client accepts, lowercased, leaving out the ones with q=0"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class _Compressor:
+    """One response body's worth of gzip or brotli state"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31: gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        # Sync flush so streamed chunks reach the client right away
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with brotli or gzip, as the client prefers.
+
+    Left untouched: bodies smaller than `minimum_size`, content types that are
+    already compressed, responses that already have a Content-Encoding, partial
+    content, and routes decorated with `no_compression`. Streaming responses
+    are compressed chunk by chunk. Bodies of `threadpool_min_size` bytes or
+    more are compressed in the threadpool so the event loop keeps serving
+    other requests meanwhile.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        threadpool_min_size: int = 64 * 1024,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.threadpool_min_size = threadpool_min_size
+
+    def _choose_encoding(self, scope: Scope) -> Optional[str]:
+        accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, scope, send, encoding)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, scope: Scope, send: Send, encoding: str):
+        self.middleware = middleware
+        self.scope = scope
+        self.inner_send = send
+        self.encoding = encoding
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _should_skip(self, message: Message) -> bool:
+        endpoint = self.scope.get("endpoint")
+        if getattr(endpoint, "__no_compression__", False):
+            return True
+        if message["status"] in (204, 206, 304) or message["status"] < 200:
+            return True
+        headers = Headers(raw=message["headers"])
+        if "content-encoding" in headers or "content-range" in headers:
+            return True
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(SKIP_CONTENT_TYPES)
+
+    async def _compress(self, data: bytes, final: bool) -> bytes:
+        if len(data) >= self.middleware.threadpool_min_size:
+            return await run_in_threadpool(self.compressor.compress, data, final)
+        return self.compressor.compress(data, final)
+
+    def _compressed_headers(self) -> MutableHeaders:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # Same content, different bytes: only a weak validator still holds
+            headers["etag"] = f"W/{etag}"
+        return headers
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            self.passthrough = self._should_skip(message)
+            if self.passthrough:
+                await self.inner_send(message)
+            return
+
+        if self.passthrough or message_type != "http.response.body":
+            await self.inner_send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Too small to be worth it
+                self.passthrough = True
+                await self.inner_send(self.start_message)
+                await self.inner_send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = self._compressed_headers()
+            compressed = await self._compress(body, final=not more_body)
+            if more_body:
+                # Streaming: the final length is unknown
+                del headers["content-length"]
+            else:
+                headers["content-length"] = str(len(compressed))
+            await self.inner_send(self.start_message)
+            await self.inner_send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        compressed = await self._compress(body, final=not more_body)
+        await self.inner_send({"type": "http.response.body", "body": compressed, "more_body": more_body})
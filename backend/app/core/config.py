@@ -1,3 +1,4 @@
+import os
 import secrets
 from typing import Any, Dict, List, Optional, Union
 from pydantic import AnyHttpUrl, EmailStr, validator
@@ -23,22 +24,109 @@ class Settings(BaseSettings):
         raise ValueError(v)
 
     PROJECT_NAME: str = "TechStore API"
+    # Debug: responses carry diagnostic headers (Server-Timing, X-DB-*)
+    DEBUG: bool = False
     
     # Database settings
     SQLALCHEMY_DATABASE_URI: str = "sqlite:///./app/db/inventario.db"
     SQLALCHEMY_TEST_DATABASE_URI: str = "sqlite:///./test.db"
+    # Connection pool: "queue" (QueuePool) or "static" (a single shared
+    # connection, the previous behaviour)
+    DB_POOL_MODE: str = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    # SQLite specific: WAL lets readers run alongside a single writer
+    SQLITE_WAL: bool = True
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # The same statement run this many times in one request is logged as a likely N+1
+    QUERY_REPEAT_THRESHOLD: int = 5
+    # Opt-in log of statements slower than the threshold, with their query plan
+    SLOW_QUERY_LOG_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_LOG_QUEUE_SIZE: int = 1000
+
+    @validator("DB_POOL_MODE")
+    def validate_pool_mode(cls, v: str) -> str:
+        if v not in ("queue", "static"):
+            raise ValueError(f"DB_POOL_MODE must be 'queue' or 'static', not {v!r}")
+        return v
     
     # User related
     USERS_OPEN_REGISTRATION: bool = True
+    # fecha_ultimo_acceso is written in batches: every N seconds or every M users
+    LAST_ACCESS_FLUSH_INTERVAL: float = 30.0
+    LAST_ACCESS_FLUSH_MAX_PENDING: int = 500
+    # Cache of decoded tokens and their user, per process
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL: float = 60.0
+    # bcrypt runs in a process pool; beyond workers + queue requests get a 503
+    PASSWORD_HASH_WORKERS: int = max(1, (os.cpu_count() or 2) // 2)
+    PASSWORD_HASH_MAX_QUEUE: int = 32
+    PASSWORD_HASH_RETRY_AFTER: int = 1
     
     # Email settings for future use
     EMAILS_ENABLED: bool = False
     EMAILS_FROM_EMAIL: Optional[EmailStr] = None
     EMAILS_FROM_NAME: Optional[str] = None
     
+    # In-process cache for product reads
+    CATALOG_CACHE_SIZE: int = 512
+    CATALOG_CACHE_TTL: float = 30.0
+    # Product lists skip the response_model validation and are encoded with orjson
+    FAST_LIST_RESPONSES: bool = True
+    
+    # Bulk product import: rows per transaction and error rows reported
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_MAX_ERRORS: int = 1000
+    
+    # Cart reservations: held stock is released when the hold expires
+    HOLD_TTL_SECONDS: int = 900
+    HOLD_SWEEP_INTERVAL: float = 5.0
+    HOLD_SWEEP_BATCH: int = 500
+    
     # Static files
     STATIC_PATH: str = "app/static"
     UPLOAD_FOLDER: str = "uploads"
+    # Uploads are copied in chunks of this size and rejected past the maximum
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    # Resized WebP/JPEG copies of product images, by name and maximum width
+    IMAGE_VARIANT_WIDTHS: Dict[str, int] = {"thumb": 160, "card": 480, "full": 1280}
+    IMAGE_VARIANT_QUALITY: int = 80
+    IMAGE_VARIANT_WORKERS: int = 2
+    # Uploads nobody references are deleted, once unused for the grace period
+    UPLOAD_GC_INTERVAL: float = 3600.0
+    UPLOAD_GC_GRACE_SECONDS: int = 3600
+    # /static/img/{path}?w=&h=&fmt= renders, cached on disk up to a total size
+    IMAGE_CACHE_PATH: str = "app/cache/images"
+    IMAGE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    IMAGE_RESIZE_MAX_DIMENSION: int = 2048
+    IMAGE_RESIZE_WORKERS: int = 2
+    # manage compress-static skips files smaller than this
+    STATIC_PRECOMPRESS_MIN_SIZE: int = 1024
+    
+    # Response compression (brotli needs the optional brotli package)
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Bodies at least this large are compressed in the threadpool
+    COMPRESSION_THREADPOOL_MIN_SIZE: int = 64 * 1024
+    
+    # Per-route latency histograms, served at /metrics in Prometheus format
+    METRICS_ENABLED: bool = True
+    # Histogram `le` bounds, in seconds
+    METRICS_BUCKETS: List[float] = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+    # With a token, /metrics asks for it as a bearer token and also exports the
+    # /api/v1/stats internals; without one it only has the request metrics
+    METRICS_TOKEN: Optional[str] = None
+    # Sampling profiler for single requests (X-Profile header, admins only)
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL_MS: float = 2.0
+    PROFILING_MAX_SECONDS: float = 30.0
+    # At most one profiled request per this many seconds
+    PROFILING_MIN_INTERVAL: float = 10.0
+    PROFILE_PATH: str = "app/cache/profiles"
     
     class Config:
         case_sensitive = True
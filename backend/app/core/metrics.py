@@ -0,0 +1,290 @@
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from starlette.routing import Mount
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Log-linear (HDR-style) buckets over microseconds: values below 2**SUB_BUCKET_BITS
+# get a bucket each, larger ones 2**SUB_BUCKET_BITS buckets per power of two,
+# so any recorded value is known to within 1 / 2**SUB_BUCKET_BITS (~6%)
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Up to 2**36 µs (~19 hours); anything slower lands in the last bucket
+BUCKET_COUNT = (36 - SUB_BUCKET_BITS + 1) * SUB_BUCKETS
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Starlette appends "; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def bucket_index(micros: int) -> int:
+    if micros < SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return min((shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS, BUCKET_COUNT - 1)
+
+
+def bucket_bounds(index: int) -> Tuple[int, int]:
+    """Lowest value and the value just past the highest one (µs) of a bucket"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index % SUB_BUCKETS + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class RouteSeries:
+    """Counters of one method + route, written by a single thread"""
+
+    __slots__ = ("buckets", "count", "total_micros", "max_micros", "statuses")
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total_micros = 0
+        self.max_micros = 0
+        self.statuses: Dict[int, int] = {}
+
+    def merge(self, other: "RouteSeries") -> None:
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total_micros += other.total_micros
+        self.max_micros = max(self.max_micros, other.max_micros)
+        for status_code, count in list(other.statuses.items()):
+            self.statuses[status_code] = self.statuses.get(status_code, 0) + count
+
+    def quantile(self, q: float) -> int:
+        """Upper bound (µs) of the bucket holding the `q` quantile"""
+        if not self.count:
+            return 0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bucket_bounds(index)[1] - 1, self.max_micros)
+        return self.max_micros
+
+
+class _Shard:
+    __slots__ = ("series", "in_flight")
+
+    def __init__(self):
+        self.series: Dict[Tuple[str, str], RouteSeries] = {}
+        self.in_flight: Dict[str, int] = {}
+
+
+class RequestMetrics:
+    """
+    Per-route request latency histograms and status code counters, plus
+    requests in flight by method (the route is only known once the request
+    has been routed).
+
+    Every thread that records gets its own shard, so recording takes no lock
+    and never contends: the shard's counters only ever have one writer. A
+    snapshot adds the shards up; it may see a request half recorded (counted
+    but not yet in its bucket), which is fine for monitoring.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            # Only once per thread
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def start(self, method: str) -> None:
+        """Count a request in flight; call `finish` for it from the same thread"""
+        in_flight = self._shard().in_flight
+        in_flight[method] = in_flight.get(method, 0) + 1
+
+    def finish(self, method: str, route: str, status_code: int, micros: int) -> None:
+        shard = self._shard()
+        shard.in_flight[method] -= 1
+        series = shard.series.get((method, route))
+        if series is None:
+            series = shard.series[(method, route)] = RouteSeries()
+        series.count += 1
+        series.total_micros += micros
+        if micros > series.max_micros:
+            series.max_micros = micros
+        series.buckets[bucket_index(micros)] += 1
+        series.statuses[status_code] = series.statuses.get(status_code, 0) + 1
+
+    def snapshot(self) -> Tuple[Dict[Tuple[str, str], RouteSeries], Dict[str, int]]:
+        """
+        Merged copy of every shard: the series keyed by (method, route) and
+        the requests in flight by method
+        """
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged: Dict[Tuple[str, str], RouteSeries] = {}
+        in_flight: Dict[str, int] = {}
+        for shard in shards:
+            for key, series in list(shard.series.items()):
+                merged.setdefault(key, RouteSeries()).merge(series)
+            for method, count in list(shard.in_flight.items()):
+                in_flight[method] = in_flight.get(method, 0) + count
+        return merged, in_flight
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Latency percentiles per route
+
+        Returns:
+            dict: For each "METHOD route", request count and latency in milliseconds
+        """
+        series_by_route, _ = self.snapshot()
+        return {
+            f"{method} {route}": {
+                "count": series.count,
+                "latency_ms_avg": series.total_micros / series.count / 1000 if series.count else 0.0,
+                "latency_ms_p50": series.quantile(0.50) / 1000,
+                "latency_ms_p95": series.quantile(0.95) / 1000,
+                "latency_ms_p99": series.quantile(0.99) / 1000,
+                "latency_ms_max": series.max_micros / 1000,
+            }
+            for (method, route), series in sorted(series_by_route.items())
+        }
+
+
+request_metrics = RequestMetrics()
+
+
+def _route_templates(app: Any) -> Dict[Any, str]:
+    templates: Dict[Any, str] = {}
+    for route in getattr(app, "routes", []):
+        if isinstance(route, Mount):
+            templates.setdefault(route.app, route.path + "/{path}")
+        elif hasattr(route, "endpoint"):
+            templates.setdefault(route.endpoint, route.path)
+    return templates
+
+
+class MetricsMiddleware:
+    """
+    Record every HTTP request in `metrics` under its route template
+    (`/api/v1/orders/{pedido_id}`, not the actual path, so the number of
+    series stays bounded). Requests that match no route share one series.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+        self._templates: Dict[Any, str] = {}
+        self._templates_built_for: Optional[int] = None
+
+    def _route(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        template = self._templates.get(endpoint)
+        if template is None:
+            router_app = scope.get("app")
+            routes = getattr(router_app, "routes", [])
+            if self._templates_built_for != len(routes):
+                # Built on first use and again if routes were added since
+                self._templates = _route_templates(router_app)
+                self._templates_built_for = len(routes)
+            template = self._templates.get(endpoint, UNMATCHED_ROUTE)
+        return template
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        self.metrics.start(scope["method"])
+        start = time.perf_counter_ns()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            micros = (time.perf_counter_ns() - start) // 1000
+            self.metrics.finish(scope["method"], self._route(scope), status_code, micros)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: Any) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_prometheus(
+    snapshot: Tuple[Dict[Tuple[str, str], RouteSeries], Dict[str, int]],
+    buckets: Iterable[float],
+    gauges: Iterable[Tuple[str, str, float]] = (),
+) -> str:
+    """
+    Prometheus text exposition format
+
+    Args:
+        snapshot: From `RequestMetrics.snapshot`
+        buckets: Histogram `le` bounds in seconds; each fine-grained bucket is
+            counted under the first bound that is not below its highest value,
+            so no latency is ever counted under a bound it exceeds
+        gauges: Extra (name, help, value) gauges
+
+    Returns:
+        str: The /metrics body
+    """
+    series_by_route, in_flight = snapshot
+    bounds = sorted(buckets)
+    bound_micros = [bound * 1_000_000 for bound in bounds]
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route template",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), series in sorted(series_by_route.items()):
+        per_bound = [0] * len(bounds)
+        for index, count in enumerate(series.buckets):
+            if not count:
+                continue
+            highest = bucket_bounds(index)[1] - 1
+            for position, limit in enumerate(bound_micros):
+                if highest <= limit:
+                    per_bound[position] += count
+                    break
+        cumulative = 0
+        for bound, count in zip(bounds, per_bound):
+            cumulative += count
+            lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+        labels = _labels(method=method, route=route)
+        lines.append(f'http_request_duration_seconds_bucket{_labels(method=method, route=route, le="+Inf")} {series.count}')
+        lines.append(f"http_request_duration_seconds_sum{labels} {series.total_micros / 1_000_000}")
+        lines.append(f"http_request_duration_seconds_count{labels} {series.count}")
+
+    lines.append("# HELP http_requests_total Finished requests by route template and status code")
+    lines.append("# TYPE http_requests_total counter")
+    for (method, route), series in sorted(series_by_route.items()):
+        for status_code, count in sorted(series.statuses.items()):
+            lines.append(f"http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+
+    lines.append("# HELP http_requests_in_flight Requests being served, by method")
+    lines.append("# TYPE http_requests_in_flight gauge")
+    for method, count in sorted(in_flight.items()):
+        lines.append(f"http_requests_in_flight{_labels(method=method)} {count}")
+
+    for name, help_text, value in gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
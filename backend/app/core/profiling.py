@@ -0,0 +1,211 @@
+"""
+On-demand sampling profiler for single requests.
+
+An admin adds the `X-Profile` header (or the `__profile` query parameter) to a
+request; ProfilingMiddleware then samples that request's stacks every few
+milliseconds with `sys._current_frames()` and writes them in the collapsed
+format that flamegraph.pl, speedscope and similar tools read.
+
+While the request runs on the event loop, the loop thread's stack is sampled.
+While it is suspended, its chain of awaits is recorded instead and, when it
+is waiting on a worker thread (sync endpoints, run_in_threadpool), that
+thread's stack is appended, so sync and async endpoints both show their work.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from types import FrameType
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAMETER = b"__profile="
+
+SUSPENDED_FRAME = "(suspended)"
+
+_UNSAFE_NAME_CHARACTERS = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _frame_name(frame: FrameType) -> str:
+    # Semicolons separate frames in the collapsed format
+    path = "/".join(frame.f_code.co_filename.split(os.sep)[-2:])
+    return f"{frame.f_code.co_name} ({path}:{frame.f_lineno})".replace(";", ":")
+
+
+def _stack_until(frame: Optional[FrameType], stop: Optional[FrameType] = None) -> Optional[List[str]]:
+    """Names from the outermost frame to `frame`; None if `stop` is given but not on the stack"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        if frame is stop:
+            return names[::-1]
+        frame = frame.f_back
+    return None if stop is not None else names[::-1]
+
+
+class StackSampler:
+    """
+    Sample the stacks of one request, run by the coroutine `coro` on the
+    thread `loop_thread_id`, from a background thread.
+    """
+
+    def __init__(self, coro: Any, loop_thread_id: int, interval: float, max_seconds: float):
+        self.coro = coro
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: Counter = Counter()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _awaiting_stack(self, frames: Dict[int, FrameType]) -> List[str]:
+        names = []
+        worker_id = None
+        awaitable = self.coro
+        while awaitable is not None:
+            frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+            if frame is None:
+                break
+            names.append(_frame_name(frame))
+            for value in frame.f_locals.values():
+                if isinstance(value, threading.Thread) and value.ident in frames:
+                    # anyio's run_sync_in_worker_thread keeps its worker in a local
+                    worker_id = value.ident
+            awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+        if worker_id is not None:
+            return names + (_stack_until(frames[worker_id]) or [])
+        return names + [SUSPENDED_FRAME]
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+        root = self.coro.cr_frame
+        if root is None:
+            return
+        stack = _stack_until(frames.get(self.loop_thread_id), stop=root)
+        if stack is None:
+            stack = self._awaiting_stack(frames)
+        self.samples[";".join(stack)] += 1
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stopping.wait(self.interval) and time.monotonic() < deadline:
+            self.sample()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+
+class ProfilingMiddleware:
+    """
+    Profile the requests that ask for it with the X-Profile header or the
+    `__profile` query parameter.
+
+    Only bearer tokens that `authorize` accepts (admins) can turn it on, one
+    request at a time and at most once every `min_interval` seconds; other
+    requests run normally. The response says what happened in its X-Profile
+    header: the name of the file written to `output_path`, "denied" or
+    "rate-limited".
+
+    Requests that do not ask for profiling only pay for the header check.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        authorize: Callable[[str], bool],
+        output_path: str,
+        interval: float = 0.002,
+        max_seconds: float = 30.0,
+        min_interval: float = 10.0,
+    ):
+        self.app = app
+        self.authorize = authorize
+        self.output_path = output_path
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._active = False
+        self._last_started = float("-inf")
+
+    def _requested(self, scope: Scope) -> bool:
+        if PROFILE_QUERY_PARAMETER in scope.get("query_string", b""):
+            return True
+        return any(name == b"x-profile" for name, _ in scope["headers"])
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._active or now - self._last_started < self.min_interval:
+                return False
+            self._active = True
+            self._last_started = now
+            return True
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active = False
+
+    async def _status(self, scope: Scope) -> str:
+        scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token or not await run_in_threadpool(self.authorize, token):
+            return "denied"
+        if not self._acquire():
+            return "rate-limited"
+        return "started"
+
+    def _file_name(self, scope: Scope) -> str:
+        slug = _UNSAFE_NAME_CHARACTERS.sub("_", scope["path"]).strip("_")[:80] or "root"
+        return f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{scope['method']}-{slug}.collapsed"
+
+    def _write(self, file_name: str, content: str) -> None:
+        os.makedirs(self.output_path, exist_ok=True)
+        with open(os.path.join(self.output_path, file_name), "w") as output:
+            output.write(content)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = await self._status(scope)
+        result = self._file_name(scope) if status == "started" else status
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(raw=message["headers"])[PROFILE_HEADER] = result
+            await send(message)
+
+        if status != "started":
+            await self.app(scope, receive, send_wrapper)
+            return
+
+        coro = self.app(scope, receive, send_wrapper)
+        sampler = StackSampler(coro, threading.get_ident(), self.interval, self.max_seconds)
+        sampler.start()
+        try:
+            await coro
+        finally:
+            sampler.stop()
+            try:
+                # Also when the request failed: that may be what is being profiled
+                await run_in_threadpool(self._write, result, sampler.collapsed())
+            finally:
+                self._release()
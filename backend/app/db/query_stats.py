@@ -0,0 +1,160 @@
+"""
+SQL statements per request.
+
+Engine event hooks count the statements run and the time spent in the
+database, attributed to whatever `track_queries()` block is active in the
+current context. QueryStatsMiddleware opens one such block per request, so
+sync endpoints running in the threadpool (which inherit the request's
+context) are counted as well; background threads are not.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-DB-Query-Count"
+QUERY_TIME_HEADER = "X-DB-Time-Ms"
+REPEATED_QUERIES_HEADER = "X-DB-Repeated-Queries"
+
+
+class QueryStats:
+    """Statements run inside one `track_queries()` block"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Keyed by the SQL with its placeholders, so the same query with other
+        # parameters counts as the same shape
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Shapes run at least `threshold` times, most repeated first: likely N+1 loops"""
+        return [(statement, count) for statement, count in self.shapes.most_common() if count >= threshold]
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the statements run in the current context until the block exits"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Query budget for tests: fail if the block runs more than `max_queries`
+    statements.
+
+    A TestClient runs the app in another thread, which does not see this
+    block; check endpoints with `assert_response_queries` instead.
+
+    Raises:
+        AssertionError: Listing the statements, if the budget is exceeded
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        statements = "\n".join(f"  {count}x {statement}" for statement, count in stats.shapes.most_common())
+        raise AssertionError(f"{stats.count} queries run, at most {max_queries} expected:\n{statements}")
+
+
+def assert_response_queries(response, max_queries: int) -> int:
+    """
+    Query budget of an endpoint, from a TestClient response. Needs DEBUG on,
+    so that responses carry the X-DB-* headers.
+
+    Returns:
+        int: The number of queries the request ran
+
+    Raises:
+        AssertionError: If the budget is exceeded or the headers are missing
+    """
+    count = response.headers.get(QUERY_COUNT_HEADER)
+    assert count is not None, f"No {QUERY_COUNT_HEADER} header: is DEBUG on?"
+    assert int(count) <= max_queries, (
+        f"{response.request.method} {response.request.url.path} ran {count} queries, "
+        f"at most {max_queries} expected ({response.headers.get(REPEATED_QUERIES_HEADER)} repeated shapes)"
+    )
+    return int(count)
+
+
+def install_query_hooks(engine: Engine) -> None:
+    """Attribute every statement run on `engine` to the active `track_queries()` block"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None and context is not None:
+            # The execution context lives for this one statement
+            context._query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _current.get()
+        start = getattr(context, "_query_start", None)
+        if stats is not None and start is not None:
+            stats.record(statement, time.perf_counter() - start)
+
+
+class QueryStatsMiddleware:
+    """
+    Track the queries of every HTTP request.
+
+    Statement shapes repeated `repeat_threshold` times or more in one request
+    are logged as likely N+1 patterns. With `headers` on (debug), responses
+    carry the numbers as Server-Timing and X-DB-* headers.
+    """
+
+    def __init__(self, app: ASGIApp, repeat_threshold: int = 5, headers: bool = False):
+        self.app = app
+        self.repeat_threshold = repeat_threshold
+        self.headers = headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and self.headers:
+                    # Whatever ran before the response started (streamed bodies may run more)
+                    headers = MutableHeaders(raw=message["headers"])
+                    milliseconds = stats.seconds * 1000
+                    headers.append("Server-Timing", f'db;dur={milliseconds:.2f};desc="{stats.count} queries"')
+                    headers[QUERY_COUNT_HEADER] = str(stats.count)
+                    headers[QUERY_TIME_HEADER] = f"{milliseconds:.2f}"
+                    headers[REPEATED_QUERIES_HEADER] = str(len(stats.repeated(self.repeat_threshold)))
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        for statement, count in stats.repeated(self.repeat_threshold):
+            logger.warning(
+                "Possible N+1: %s %s ran the same query %d times: %s",
+                scope["method"],
+                scope["path"],
+                count,
+                " ".join(statement.split()),
+            )
@@ -0,0 +1,119 @@
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import Float, Integer, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "articulos_fts"
+
+# External-content FTS5 table over articulos_inventario, kept in sync by triggers.
+# The UPDATE trigger only fires when nombre or descripcion change, so stock
+# updates do not touch the index.
+_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        nombre, descripcion,
+        content='articulos_inventario', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON articulos_inventario BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON articulos_inventario BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF nombre, descripcion ON articulos_inventario BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, nombre, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.descripcion);
+        INSERT INTO {FTS_TABLE}(rowid, nombre, descripcion)
+        VALUES (new.id, new.nombre, new.descripcion);
+    END
+    """,
+]
+
+# nombre weighs ten times more than descripcion in the bm25 ranking
+_RANKING_SQL = f"""
+    SELECT rowid, bm25({FTS_TABLE}, 10.0, 1.0) AS rank
+    FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH :match
+"""
+
+fts_enabled = False
+
+
+def create_search_index(engine: Engine) -> bool:
+    """
+    Create the FTS5 index and its triggers if they do not exist yet, and fill
+    it from articulos_inventario the first time.
+
+    Returns:
+        bool: True if full-text search is available
+    """
+    global fts_enabled
+    if engine.dialect.name != "sqlite":
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+            ).first()
+            for statement in _SCHEMA:
+                conn.exec_driver_sql(statement)
+            if not exists:
+                conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    except OperationalError:
+        logger.warning("SQLite was built without FTS5, product search falls back to LIKE", exc_info=True)
+        fts_enabled = False
+        return False
+
+    fts_enabled = True
+    return True
+
+
+def rebuild_search_index(engine: Engine) -> None:
+    """Rebuild the whole FTS5 index from articulos_inventario"""
+    create_search_index(engine)
+    if not fts_enabled:
+        raise RuntimeError("FTS5 is not available in this SQLite build")
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query where every word is a prefix match and
+    all words must appear, e.g. `port gam` -> `"port"* "gam"*`.
+
+    Returns:
+        The MATCH expression, or None if the text has no searchable words
+    """
+    words = re.findall(r"\w+", q.lower())
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_ranking(match: str):
+    """
+    Subquery with the `rowid` and bm25 `rank` (lower is better) of the matching articles
+    """
+    return (
+        text(_RANKING_SQL)
+        .bindparams(match=match)
+        .columns(rowid=Integer, rank=Float)
+        .subquery("articulos_fts_rank")
+    )
@@ -1,19 +1,103 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.pool import QueuePool, StaticPool
 from sqlmodel import Session, SQLModel, create_engine
-from sqlmodel.pool import StaticPool
 
 from app.core.config import settings
+from app.db.query_stats import install_query_hooks
+from app.db.search import create_search_index
+from app.db.slow_queries import slow_query_log
+from app.models.derived_fields import backfill_derived_fields
 
-# Create engine for SQLite with connection pooling for better performance
-engine = create_engine(
-    settings.SQLALCHEMY_DATABASE_URI,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool
-)
+
+def _build_engine():
+    """
+    Create the database engine according to the pool settings.
+
+    For SQLite every connection is switched to WAL mode with a busy timeout, so
+    catalog reads keep running while an order is being written instead of
+    queueing behind a single shared connection.
+    """
+    uri = settings.SQLALCHEMY_DATABASE_URI
+    if not uri.startswith("sqlite"):
+        return create_engine(
+            uri,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_pre_ping=True,
+        )
+
+    connect_args = {
+        "check_same_thread": False,
+        "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    in_memory = uri in ("sqlite://", "sqlite:///:memory:")
+
+    # An in-memory database only exists inside its connection, so it has to be shared
+    if settings.DB_POOL_MODE == "static" or in_memory:
+        engine = create_engine(uri, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            uri,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        if settings.SQLITE_WAL and not in_memory:
+            cursor.execute("PRAGMA journal_mode = WAL")
+            # NORMAL is durable under WAL and avoids an fsync on every commit
+            cursor.execute("PRAGMA synchronous = NORMAL")
+        cursor.close()
+
+    return engine
+
+
+engine = _build_engine()
+install_query_hooks(engine)
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_query_log.install(engine)
+
+
+def _add_missing_columns():
+    """
+    Add nullable columns declared in the models but missing from existing tables.
+    There are no migrations, and create_all never alters a table that exists.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}')
 
 
 def create_db_and_tables():
     """Create database tables from SQLModel models"""
+    # Register the tables even when called outside the app (python -m app.manage)
+    from app.models import db_models  # noqa: F401
+    
     SQLModel.metadata.create_all(engine)
+    _add_missing_columns()
+    # create_all skips existing tables, so indexes added later are created here
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    create_search_index(engine)
+    # Products written before the derived columns existed
+    backfill_derived_fields(engine)
 
 
 def get_session():
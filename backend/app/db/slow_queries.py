@@ -0,0 +1,161 @@
+import logging
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# IN lists are rendered with one placeholder per value; fold them so the
+# same query with another number of values is one shape
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+# Statements SQLite has a query plan for
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b", re.IGNORECASE)
+
+# Plans are captured once per shape, for this many shapes at most
+MAX_EXPLAINED_SHAPES = 10000
+# Longer parameter lists are cut in the log
+MAX_PARAMETERS_LENGTH = 500
+
+
+def statement_shape(statement: str) -> str:
+    return _IN_LIST.sub("(?, ...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _format_plan(rows: List[Tuple[Any, ...]]) -> str:
+    # (id, parent, notused, detail): indent each step under its parent
+    depth: Dict[int, int] = {0: 0}
+    lines = []
+    for row in rows:
+        node_id, parent, detail = row[0], row[1], row[-1]
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append("  " * depth[node_id] + str(detail))
+    return "\n".join(lines)
+
+
+class SlowQueryLog:
+    """
+    Log statements that take `threshold_ms` or longer, with the SQLite query
+    plan of each distinct statement shape the first time it is slow.
+
+    The engine hook only times the statement and, when it is slow, puts it on
+    a bounded queue without waiting; a background thread formats the log
+    lines and runs EXPLAIN QUERY PLAN on its own connection. When the queue
+    is full the entry is dropped and counted rather than slowing the request.
+    """
+
+    def __init__(self, threshold_ms: float, max_queue: int):
+        self.threshold = threshold_ms / 1000
+        self.logged = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Tuple[str, Any, float]]]" = queue.Queue(maxsize=max_queue)
+        self._explained: set = set()
+        self._engine: Optional[Engine] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def install(self, engine: Engine) -> None:
+        """Time every statement run on `engine`"""
+        self._engine = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._slow_query_start = time.perf_counter()
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            start = getattr(context, "_slow_query_start", None)
+            if start is None:
+                return
+            elapsed = time.perf_counter() - start
+            if elapsed < self.threshold or statement.startswith("EXPLAIN"):
+                return
+            if executemany:
+                # The plan is the same for every parameter set
+                parameters = parameters[0] if parameters else ()
+            try:
+                self._queue.put_nowait((statement, parameters, elapsed))
+            except queue.Full:
+                self.dropped += 1
+
+    def _explain(self, statement: str, parameters: Any) -> Optional[str]:
+        if self._engine is None or self._engine.dialect.name != "sqlite" or not _EXPLAINABLE.match(statement):
+            return None
+        try:
+            with self._engine.connect() as conn:
+                rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        except Exception as exc:
+            return f"  (no plan: {str(exc).splitlines()[0]})"
+        return _format_plan(rows)
+
+    def _log(self, statement: str, parameters: Any, elapsed: float) -> None:
+        shape = statement_shape(statement)
+        shown_parameters = repr(parameters)
+        if len(shown_parameters) > MAX_PARAMETERS_LENGTH:
+            shown_parameters = shown_parameters[:MAX_PARAMETERS_LENGTH] + "..."
+
+        plan = None
+        if shape not in self._explained and len(self._explained) < MAX_EXPLAINED_SHAPES:
+            self._explained.add(shape)
+            plan = self._explain(statement, parameters)
+
+        self.logged += 1
+        if plan:
+            logger.warning("Slow query (%.1f ms): %s\n  parameters: %s\n  plan:\n%s", elapsed * 1000, shape, shown_parameters, plan)
+        else:
+            logger.warning("Slow query (%.1f ms): %s\n  parameters: %s", elapsed * 1000, shape, shown_parameters)
+
+    def start(self) -> None:
+        """Start the logging thread; does nothing unless installed on an engine"""
+        if self._engine is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="slow-query-log", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Log what is still queued and stop the thread"""
+        if self._thread is None:
+            return
+        # Blocks until there is room: the stop marker must not be dropped
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            try:
+                self._log(*entry)
+            except Exception:
+                logger.exception("Could not log slow query")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the log counters
+
+        Returns:
+            dict: Threshold, slow queries logged, dropped and waiting, and shapes explained
+        """
+        return {
+            "enabled": self._engine is not None,
+            "threshold_ms": self.threshold * 1000,
+            "logged": self.logged,
+            "dropped": self.dropped,
+            "queued": self._queue.qsize(),
+            "explained_shapes": len(self._explained),
+        }
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    max_queue=settings.SLOW_QUERY_LOG_QUEUE_SIZE,
+)
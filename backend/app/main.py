@@ -2,12 +2,26 @@ import os
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.utils import get_openapi
 
 from app.api.v1.api import api_router
+from app.api.v1.deps import is_admin_token
+from app.api.v1.endpoints import imagenes, metrics
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.db.query_stats import QueryStatsMiddleware
 from app.db.session import create_db_and_tables
+from app.db.slow_queries import slow_query_log
+from app.services.image_resize import resized_image_cache
+from app.services.image_variants import image_variant_generator
+from app.services.last_access import last_access_tracker
+from app.services.pagination import NEXT_CURSOR_HEADER
+from app.services.password_hashing import password_hasher
+from app.services.reservations import reservation_manager
+from app.services.static_files import PrecompressedStaticFiles
+from app.services.upload_store import upload_garbage_collector
 
 
 app = FastAPI(
@@ -22,11 +36,47 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Compress responses (gzip/brotli); see app.core.compression.no_compression to opt a route out
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    threadpool_min_size=settings.COMPRESSION_THREADPOOL_MIN_SIZE,
+)
+
+# Queries per request: N+1 warnings, and Server-Timing / X-DB-* headers in debug
+app.add_middleware(
+    QueryStatsMiddleware,
+    repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+    headers=settings.DEBUG,
+)
+
+# Per-request sampling profiler; not installed at all unless enabled
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        authorize=is_admin_token,
+        output_path=settings.PROFILE_PATH,
+        interval=settings.PROFILING_INTERVAL_MS / 1000,
+        max_seconds=settings.PROFILING_MAX_SECONDS,
+        min_interval=settings.PROFILING_MIN_INTERVAL,
+    )
+
+# Outermost, so the recorded latency covers the whole request
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router, tags=["metrics"])
+
+# Resized images; registered before the mount so /static/img/... reaches it
+app.include_router(imagenes.router, prefix="/static/img", tags=["images"])
+
 # Mount static files directory
 os.makedirs(os.path.join(settings.STATIC_PATH, settings.UPLOAD_FOLDER), exist_ok=True)
-app.mount("/static", StaticFiles(directory=settings.STATIC_PATH), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=settings.STATIC_PATH), name="static")
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -35,6 +85,21 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    last_access_tracker.start()
+    reservation_manager.start()
+    upload_garbage_collector.start()
+    slow_query_log.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    slow_query_log.stop()
+    upload_garbage_collector.stop()
+    reservation_manager.stop()
+    last_access_tracker.stop()
+    password_hasher.shutdown()
+    image_variant_generator.shutdown()
+    resized_image_cache.shutdown()
 
 
 @app.get("/")
@@ -0,0 +1,139 @@
+"""
+Tareas de mantenimiento.
+
+Uso:
+    python -m app.manage rebuild-search-index
+    python -m app.manage generate-image-variants [--all]
+    python -m app.manage backfill-derived-fields [--all]
+    python -m app.manage gc-uploads
+    python -m app.manage compress-static
+    python -m app.manage nginx-static-conf [--root DIR] [--backend URL] [--output FILE]
+"""
+import argparse
+import os
+
+from sqlalchemy import JSON, or_
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.search import rebuild_search_index
+from app.db.session import create_db_and_tables, engine
+from app.models.db_models import ArticuloInventario
+from app.models.derived_fields import backfill_derived_fields
+from app.services.image_variants import image_variant_generator
+from app.services.static_files import brotli, precompress_static, render_nginx_include
+from app.services.upload_store import upload_garbage_collector
+
+
+def rebuild_search_index_command(args):
+    print("Rebuilding search index...")
+    rebuild_search_index(engine)
+    print("Search index rebuilt")
+
+
+def generate_image_variants_command(args):
+    query = select(ArticuloInventario.id, ArticuloInventario.image_url).where(
+        ArticuloInventario.image_url.like("/static/%")
+    )
+    if not args.all:
+        # Rows written before image_variants had none_as_null hold the JSON 'null'
+        query = query.where(
+            or_(ArticuloInventario.image_variants.is_(None), ArticuloInventario.image_variants == JSON.NULL)
+        )
+    with Session(engine) as db:
+        articulos = db.exec(query).all()
+
+    print(f"Generating image variants for {len(articulos)} products...")
+    generated = 0
+    try:
+        for articulo_id, image_url in articulos:
+            if image_variant_generator.generate_for_articulo(articulo_id, image_url):
+                generated += 1
+    finally:
+        image_variant_generator.shutdown()
+    print(f"Image variants generated for {generated} products")
+
+
+def backfill_derived_fields_command(args):
+    print("Computing derived product fields...")
+    updated = backfill_derived_fields(engine, only_missing=not args.all)
+    print(f"Derived fields computed for {updated} products")
+
+
+def gc_uploads_command(args):
+    print("Deleting unreferenced uploads...")
+    deleted, freed = upload_garbage_collector.collect()
+    print(f"Deleted {deleted} files, {freed} bytes freed")
+
+
+def compress_static_command(args):
+    if brotli is None:
+        print("brotli is not installed, only .gz files will be written")
+    print("Precompressing static files...")
+    written, up_to_date = precompress_static()
+    print(f"{written} compressed files written, {up_to_date} already up to date")
+
+
+def nginx_static_conf_command(args):
+    include = render_nginx_include(args.root, args.backend)
+    if args.output == "-":
+        print(include, end="")
+        return
+    with open(args.output, "w") as output:
+        output.write(include)
+    print(f"nginx include written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "rebuild-search-index",
+        help="Rebuild the full-text search index from articulos_inventario",
+    ).set_defaults(func=rebuild_search_index_command)
+
+    variants_parser = subparsers.add_parser(
+        "generate-image-variants",
+        help="Generate the resized image variants of products that have none",
+    )
+    variants_parser.add_argument("--all", action="store_true", help="Process every product, not only those without variants")
+    variants_parser.set_defaults(func=generate_image_variants_command)
+
+    derived_parser = subparsers.add_parser(
+        "backfill-derived-fields",
+        help="Compute the derived columns (search key, fallback image) of products that lack them",
+    )
+    derived_parser.add_argument("--all", action="store_true", help="Recompute every product, not only those missing them")
+    derived_parser.set_defaults(func=backfill_derived_fields_command)
+
+    subparsers.add_parser(
+        "gc-uploads",
+        help="Delete uploaded files no product references, after the grace period",
+    ).set_defaults(func=gc_uploads_command)
+
+    subparsers.add_parser(
+        "compress-static",
+        help="Write .gz/.br copies of compressible static files for the /static mount and nginx",
+    ).set_defaults(func=compress_static_command)
+
+    nginx_parser = subparsers.add_parser(
+        "nginx-static-conf",
+        help="Generate an nginx include that serves /static from disk",
+    )
+    nginx_parser.add_argument(
+        "--root",
+        default=os.path.abspath(settings.STATIC_PATH),
+        help="Static directory as seen by nginx (default: STATIC_PATH)",
+    )
+    nginx_parser.add_argument("--backend", default="http://localhost:8000", help="Backend URL for /static/img/")
+    nginx_parser.add_argument("--output", default="-", help="File to write, - for stdout")
+    nginx_parser.set_defaults(func=nginx_static_conf_command)
+
+    args = parser.parse_args()
+    create_db_and_tables()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
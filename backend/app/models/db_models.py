@@ -1,7 +1,10 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+from sqlalchemy import JSON, Column, Index, event
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.models.derived_fields import derived_fields
+
 
 class Usuario(SQLModel, table=True):
     __tablename__ = "usuarios"
@@ -29,17 +32,39 @@ class ArticuloInventario(SQLModel, table=True):
     cantidad: int
     precio: float
     fecha_creacion: datetime = Field(default_factory=datetime.utcnow)
-    fecha_actualizacion: Optional[datetime] = None
+    # Indexado: max(fecha_actualizacion) alimenta el ETag del catálogo
+    fecha_actualizacion: Optional[datetime] = Field(default=None, index=True)
     
     # Campo para URL de imagen (no existe en la DB original, lo añadiremos en la API)
     image_url: Optional[str] = None
+    # Versiones redimensionadas de la imagen: {"thumb": {"width", "height", "webp", "jpeg"}, ...}
+    image_variants: Optional[Dict[str, Dict[str, Any]]] = Field(default=None, sa_column=Column(JSON(none_as_null=True)))
+    # Referencia del proveedor, clave opcional de la importación masiva
+    sku: Optional[str] = Field(default=None, unique=True, index=True)
+    
+    # Campos derivados de `nombre`, calculados al escribir (ver derived_fields)
+    fallback_image_url: Optional[str] = None
+    # El índice lo usa el backfill (search_key IS NULL); los filtros por subcadena no
+    search_key: Optional[str] = Field(default=None, index=True)
     
     # Relaciones
     pedido_articulos: List["PedidoArticulo"] = Relationship(back_populates="articulo")
 
 
+@event.listens_for(ArticuloInventario, "before_insert")
+@event.listens_for(ArticuloInventario, "before_update")
+def _set_derived_fields(mapper, connection, target):
+    for field, value in derived_fields(target.nombre).items():
+        setattr(target, field, value)
+
+
 class Pedido(SQLModel, table=True):
     __tablename__ = "pedidos"
+    __table_args__ = (
+        # Listados paginados por (fecha_pedido, id), de todos o de un usuario
+        Index("ix_pedidos_fecha_pedido_id", "fecha_pedido", "id"),
+        Index("ix_pedidos_usuario_fecha_pedido_id", "usuario_id", "fecha_pedido", "id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     usuario_id: int = Field(foreign_key="usuarios.id")
@@ -68,6 +93,31 @@ class PedidoArticulo(SQLModel, table=True):
     articulo: ArticuloInventario = Relationship(back_populates="pedido_articulos")
 
 
+class ReservaInventario(SQLModel, table=True):
+    __tablename__ = "reservas_inventario"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    usuario_id: int = Field(foreign_key="usuarios.id", index=True)
+    articulo_id: int = Field(foreign_key="articulos_inventario.id", index=True)
+    # Unidades ya descontadas de articulos_inventario.cantidad
+    cantidad: int
+    fecha_creacion: datetime = Field(default_factory=datetime.utcnow)
+    fecha_expiracion: datetime = Field(index=True)
+
+
+class ArchivoSubido(SQLModel, table=True):
+    __tablename__ = "archivos_subidos"
+    
+    # Los archivos subidos se guardan con su SHA-256 como nombre
+    sha256: str = Field(primary_key=True)
+    ruta: str = Field(unique=True, index=True)  # URL bajo /static
+    tamano: int
+    # Artículos cuyo image_url apunta a este archivo
+    referencias: int = 0
+    fecha_creacion: datetime = Field(default_factory=datetime.utcnow)
+    fecha_ultimo_uso: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
 # Modelos para API y respuestas
 class UsuarioBase(SQLModel):
     email: str
@@ -100,6 +150,7 @@ class ArticuloBase(SQLModel):
     cantidad: int
     precio: float
     image_url: Optional[str] = None
+    sku: Optional[str] = None
 
 
 class ArticuloCreate(ArticuloBase):
@@ -108,6 +159,7 @@ class ArticuloCreate(ArticuloBase):
 
 class ArticuloRead(ArticuloBase):
     id: int
+    image_variants: Optional[Dict[str, Dict[str, Any]]] = None
     fecha_creacion: datetime
     fecha_actualizacion: Optional[datetime] = None
 
@@ -118,6 +170,19 @@ class ArticuloUpdate(SQLModel):
     cantidad: Optional[int] = None
     precio: Optional[float] = None
     image_url: Optional[str] = None
+    sku: Optional[str] = None
+
+
+class ImportacionError(SQLModel):
+    fila: int
+    error: str
+
+
+class ImportacionResultado(SQLModel):
+    insertados: int = 0
+    actualizados: int = 0
+    total_errores: int = 0
+    errores: List[ImportacionError] = []
 
 
 class PedidoBase(SQLModel):
@@ -153,6 +218,50 @@ class PedidoArticuloRead(PedidoArticuloBase):
     pass
 
 
+class PedidoLineaCheckout(SQLModel):
+    articulo_id: int
+    cantidad: int
+
+
+class PedidoCheckout(SQLModel):
+    # Por defecto, el usuario autenticado
+    usuario_id: Optional[int] = None
+    direccion_envio: Optional[str] = None
+    notas: Optional[str] = None
+    lineas: List[PedidoLineaCheckout]
+
+
+class PedidoConArticulosRead(PedidoRead):
+    articulos: List[PedidoArticuloRead] = []
+
+
+class ReservaCreate(SQLModel):
+    articulo_id: int
+    cantidad: int
+
+
+class ReservaRead(SQLModel):
+    id: int
+    usuario_id: int
+    articulo_id: int
+    cantidad: int
+    fecha_creacion: datetime
+    fecha_expiracion: datetime
+
+
+class ReservaCheckout(SQLModel):
+    # Por defecto, todas las reservas activas del usuario
+    reservas: Optional[List[int]] = None
+    direccion_envio: Optional[str] = None
+    notas: Optional[str] = None
+
+
+class StockDisponibleRead(SQLModel):
+    articulo_id: int
+    disponible: int
+    reservado: int
+
+
 # Token model para autenticación
 class Token(SQLModel):
     access_token: str
@@ -0,0 +1,84 @@
+"""
+Campos derivados de ArticuloInventario.
+
+Se calculan al escribir el artículo (eventos before_insert/before_update en
+db_models, y a mano en las escrituras con SQL directo como la importación
+masiva), de modo que las lecturas no tengan que hacer trabajo por fila.
+"""
+import re
+import unicodedata
+from typing import Dict, Optional
+from urllib.parse import quote
+
+FALLBACK_IMAGE_URL = "https://source.unsplash.com/featured/?{term}&tech"
+
+# Columnas que dependen de `nombre`
+DERIVED_FIELDS = ("fallback_image_url", "search_key")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_search_key(text: Optional[str]) -> Optional[str]:
+    """
+    Lowercase `text`, strip accents and collapse whitespace, so that
+    "Ratón  Óptico" and "raton optico" compare equal
+    """
+    if text is None:
+        return None
+    decomposed = unicodedata.normalize("NFKD", text)
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _WHITESPACE.sub(" ", without_accents).strip().lower()
+
+
+def fallback_image_url(nombre: Optional[str]) -> Optional[str]:
+    """Image shown for products without one: an Unsplash search on the first word of the name"""
+    words = (nombre or "").split()
+    if not words:
+        return None
+    return FALLBACK_IMAGE_URL.format(term=quote(words[0].lower()))
+
+
+def derived_fields(nombre: Optional[str]) -> Dict[str, Optional[str]]:
+    """All the derived columns for a product called `nombre`"""
+    return {
+        "fallback_image_url": fallback_image_url(nombre),
+        "search_key": normalize_search_key(nombre),
+    }
+
+
+def backfill_derived_fields(engine, only_missing: bool = True, batch_size: int = 1000) -> int:
+    """
+    Compute the derived columns of existing products, `batch_size` rows per
+    transaction
+
+    Args:
+        engine: The engine to use
+        only_missing: Only rows whose search_key was never computed
+
+    Returns:
+        int: The number of rows updated
+    """
+    from sqlalchemy import bindparam, select, update
+
+    from app.models.db_models import ArticuloInventario
+
+    articulos = ArticuloInventario.__table__
+    stmt = (
+        update(articulos)
+        .where(articulos.c.id == bindparam("_id"))
+        .values({field: bindparam(field) for field in DERIVED_FIELDS})
+    )
+
+    updated = 0
+    last_id = 0
+    while True:
+        query = select(articulos.c.id, articulos.c.nombre).where(articulos.c.id > last_id)
+        if only_missing:
+            query = query.where(articulos.c.search_key.is_(None))
+        with engine.begin() as conn:
+            rows = conn.execute(query.order_by(articulos.c.id).limit(batch_size)).all()
+            if not rows:
+                return updated
+            conn.execute(stmt, [dict(derived_fields(nombre), _id=articulo_id) for articulo_id, nombre in rows])
+        updated += len(rows)
+        last_id = rows[-1][0]
@@ -0,0 +1,76 @@
+import threading
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from app.core.config import settings
+from app.services.cache import TTLCache
+
+
+class CatalogCache:
+    """
+    Read-through cache for the product endpoints.
+
+    Holds already serialized rows: single articles under ("item", id) and list
+    pages under ("list", <normalized query params>). Any write to an article
+    drops that article's entry and every cached list, since a create, rename or
+    stock change can move rows in or out of any page.
+
+    `version` is bumped on every invalidation. A reader takes it before querying
+    the database and `set` ignores the value if a write happened in between, so
+    a slow read can never put stale data back in the cache.
+
+    Invalidation only sees this process's writes. Every entry is therefore
+    stored with the ETag it was read under, and `get` treats another ETag as
+    a miss. A write from another worker changes the ETag, so the stale body
+    is never served under the new one.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @staticmethod
+    def item_key(articulo_id: int) -> Hashable:
+        return ("item", articulo_id)
+
+    @staticmethod
+    def list_key(**params: Any) -> Hashable:
+        return ("list",) + tuple(sorted(params.items()))
+
+    def get(self, key: Hashable, etag: str) -> Optional[Any]:
+        entry = self._cache.get(key)
+        if entry is None or entry[0] != etag:
+            return None
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, version: int, etag: str) -> None:
+        with self._lock:
+            if version == self.version:
+                self._cache.set(key, (etag, value))
+
+    def invalidate(self, articulo_ids: Iterable[int] = ()) -> None:
+        """
+        Drop the cached entries affected by a write
+
+        Args:
+            articulo_ids: The articles that were created, changed or deleted
+        """
+        with self._lock:
+            self.version += 1
+            for articulo_id in articulo_ids:
+                self._cache.pop(self.item_key(articulo_id))
+            self._cache.discard_where(lambda key: key[0] == "list")
+
+    def clear(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._cache.stats(), version=self.version)
+
+
+catalog_cache = CatalogCache(
+    maxsize=settings.CATALOG_CACHE_SIZE,
+    ttl=settings.CATALOG_CACHE_TTL,
+)
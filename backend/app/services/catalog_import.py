@@ -0,0 +1,226 @@
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Tuple
+
+from pydantic import ValidationError, validate_model
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.models.derived_fields import DERIVED_FIELDS, derived_fields
+from app.models.db_models import ArticuloInventario, ArticuloUpdate, ImportacionError, ImportacionResultado
+
+_articulos = ArticuloInventario.__table__
+
+IMPORT_FIELDS = ("nombre", "descripcion", "cantidad", "precio", "image_url", "sku")
+
+# Fields a row must have to create a new article; updates may send any subset
+REQUIRED_FIELDS = ("nombre", "cantidad", "precio")
+
+# Bytes read from the upload at a time
+READ_SIZE = 64 * 1024
+
+
+def iter_text_lines(stream: BinaryIO) -> Iterator[str]:
+    """
+    Decode a UTF-8 upload (with or without BOM) one line at a time, keeping
+    the line endings.
+
+    io.TextIOWrapper would be simpler, but UploadFile.file is a
+    SpooledTemporaryFile, which before Python 3.11 lacks the `readable()`
+    family that TextIOWrapper needs.
+
+    Raises:
+        UnicodeDecodeError: If the upload is not valid UTF-8
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        data = stream.read(READ_SIZE)
+        pending += decoder.decode(data, final=not data)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+        if not data:
+            break
+    if pending:
+        yield pending
+
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Parse a CSV upload one row at a time
+
+    Yields:
+        The line number and the row as a dict
+    """
+    reader = csv.DictReader(iter_text_lines(stream))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson_rows(stream: BinaryIO) -> Iterator[Tuple[int, Any]]:
+    """
+    Parse an NDJSON upload one line at a time. Lines that are not valid JSON
+    are yielded as the exception so they end up in the error report.
+    """
+    for line_num, line in enumerate(iter_text_lines(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_num, json.loads(line)
+        except ValueError as exc:
+            yield line_num, exc
+
+
+def _clean_row(row: Any) -> Dict[str, Any]:
+    """Validate a parsed row and keep only the known, non-empty fields"""
+    if isinstance(row, Exception):
+        raise ValueError(f"JSON no válido: {row}")
+    if not isinstance(row, dict):
+        raise ValueError("Cada fila debe ser un objeto")
+
+    data = {
+        key: value.strip() if isinstance(value, str) else value
+        for key, value in row.items()
+        if key in IMPORT_FIELDS
+    }
+    data = {key: value for key, value in data.items() if value not in ("", None)}
+    # validate_model skips building a model instance, which is most of the cost per row
+    values, _, error = validate_model(ArticuloUpdate, data)
+    if error:
+        raise error
+    return {key: values[key] for key in data}
+
+
+def _upsert_chunk(
+    db: Session, rows: List[Tuple[int, Dict[str, Any]]], key: str
+) -> Tuple[int, int, List[Tuple[int, str]]]:
+    """
+    Insert or update one chunk of rows in a single transaction
+
+    Updates only set the fields present in each row. Rows are grouped by their
+    set of fields so each group is a single executemany.
+
+    Returns:
+        The number of inserted and updated rows, and the rows that could not
+        be inserted because they lack a required field
+    """
+    # The last row wins when a key is repeated inside the chunk
+    by_key: Dict[Any, Dict[str, Any]] = {}
+    lines: Dict[Any, int] = {}
+    for line_num, data in rows:
+        by_key[data[key]] = data
+        lines[data[key]] = line_num
+
+    existing = set(
+        db.execute(select(_articulos.c[key]).where(_articulos.c[key].in_(list(by_key)))).scalars()
+    )
+    ahora = datetime.utcnow()
+
+    inserts = []
+    errors = []
+    for value, data in by_key.items():
+        if value in existing:
+            continue
+        missing = [field for field in REQUIRED_FIELDS if field not in data]
+        if missing:
+            errors.append((lines[value], f"Faltan campos para crear el artículo: {', '.join(missing)}"))
+            continue
+        inserts.append(
+            dict(
+                {"descripcion": None, "image_url": None, "sku": None},
+                **data,
+                **derived_fields(data["nombre"]),
+                fecha_creacion=ahora,
+            )
+        )
+    if inserts:
+        db.execute(insert(_articulos), inserts)
+
+    updates: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for value, data in by_key.items():
+        if value in existing:
+            fields = tuple(sorted(field for field in data if field != key))
+            params = dict(data, _key=value, fecha_actualizacion=ahora)
+            if "nombre" in fields:
+                fields += DERIVED_FIELDS
+                params.update(derived_fields(data["nombre"]))
+            updates.setdefault(fields, []).append(params)
+    for fields, params in updates.items():
+        stmt = (
+            update(_articulos)
+            .where(_articulos.c[key] == bindparam("_key"))
+            .values({field: bindparam(field) for field in fields + ("fecha_actualizacion",)})
+        )
+        if "image_url" in fields:
+            # Variants of the previous image no longer apply
+            stmt = stmt.values(image_variants=None)
+        db.execute(stmt, params)
+
+    db.commit()
+    return len(inserts), len(by_key) - len(inserts) - len(errors), errors
+
+
+def import_articulos(db: Session, rows: Iterator[Tuple[int, Any]], key: str = "nombre") -> ImportacionResultado:
+    """
+    Upsert articles from parsed rows, `IMPORT_CHUNK_SIZE` rows per transaction
+
+    Args:
+        db: The session to use
+        rows: (line number, row) pairs from `iter_csv_rows` or `iter_ndjson_rows`
+        key: The column that identifies an existing article, `nombre` or `sku`
+
+    Returns:
+        The counters and the per-row error report
+    """
+    result = ImportacionResultado()
+
+    def add_error(line_num: int, error: str) -> None:
+        result.total_errores += 1
+        if len(result.errores) < settings.IMPORT_MAX_ERRORS:
+            result.errores.append(ImportacionError(fila=line_num, error=error))
+
+    def flush(chunk: List[Tuple[int, Dict[str, Any]]]) -> None:
+        try:
+            inserted, updated, errors = _upsert_chunk(db, chunk, key)
+        except SQLAlchemyError as exc:
+            db.rollback()
+            if len(chunk) > 1:
+                # Save the chunk row by row, so only the rows at fault are reported
+                for row in chunk:
+                    flush([row])
+                return
+            message = str(exc.orig) if getattr(exc, "orig", None) else str(exc)
+            add_error(chunk[0][0], f"Error al guardar la fila: {message}")
+            return
+        result.insertados += inserted
+        result.actualizados += updated
+        for line_num, error in errors:
+            add_error(line_num, error)
+
+    chunk: List[Tuple[int, Dict[str, Any]]] = []
+    for line_num, row in rows:
+        try:
+            data = _clean_row(row)
+        except ValidationError as exc:
+            add_error(line_num, "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()))
+            continue
+        except ValueError as exc:
+            add_error(line_num, str(exc))
+            continue
+        if key not in data:
+            add_error(line_num, f"Falta la clave '{key}'")
+            continue
+
+        chunk.append((line_num, data))
+        if len(chunk) >= settings.IMPORT_CHUNK_SIZE:
+            flush(chunk)
+            chunk = []
+
+    if chunk:
+        flush(chunk)
+    return result
@@ -0,0 +1,43 @@
+from typing import Any, Dict, List, Sequence, Type
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from sqlmodel import SQLModel
+
+
+def model_columns(table_model: Type[SQLModel], read_model: Type[SQLModel], **overrides: Any) -> List[Any]:
+    """
+    The columns of `table_model` that `read_model` returns, in field order,
+    for selecting exactly what a response needs instead of whole ORM objects.
+    `overrides` replaces the column of a field with another SQL expression.
+    """
+    return [
+        overrides[name].label(name) if name in overrides else getattr(table_model, name)
+        for name in read_model.__fields__
+    ]
+
+
+def rows_to_dicts(rows: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Plain dicts from Core result rows, keyed by column name"""
+    return [dict(row._mapping) for row in rows]
+
+
+def fast_json_response(content: Any, response: Response) -> ORJSONResponse:
+    """
+    Encode `content` with orjson and return it as is, so FastAPI does not
+    validate it against the response_model again. The content must already
+    have the shape of the response model.
+
+    Args:
+        content: Plain dicts and lists, datetimes and numbers
+        response: The `Response` parameter of the endpoint; the headers set on
+            it (ETag, cursors...) are carried over
+
+    Returns:
+        ORJSONResponse: The response to return from the endpoint
+    """
+    fast = ORJSONResponse(content, status_code=response.status_code or 200)
+    for name, value in response.headers.items():
+        if name != "content-length":
+            fast.headers[name] = value
+    return fast
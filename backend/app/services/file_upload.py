@@ -1,14 +1,172 @@
+import hashlib
 import os
-import shutil
-import uuid
-from typing import Optional
+import tempfile
+from typing import Callable, NamedTuple, Optional, Tuple
 from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.services.image_variants import image_variant_generator
+
+# Magic bytes of the accepted image formats and the extension stored for each
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+
+def sniff_image_extension(head: bytes) -> Optional[str]:
+    """
+    Detect the image format from the first bytes of a file
+    
+    Returns:
+        str: The extension for the format, or None if it is not a supported image
+    """
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class StoredUpload(NamedTuple):
+    """An upload saved under its content hash"""
+    name: str  # Relative to the destination directory, e.g. "ab/ab12...ef.png"
+    path: str
+    sha256: str
+    size: int
+
+
+async def stream_to_temp_file(
+    file: UploadFile, directory: str, max_size: Optional[int] = None
+) -> Tuple[str, bytes, str, int]:
+    """
+    Copy an upload to a temporary file in `directory`, one chunk at a time,
+    hashing it on the way. Disk writes run in the threadpool so the event loop
+    never blocks on them.
+    
+    Args:
+        file: The uploaded file
+        directory: Where to create the temporary file; use the final directory
+            (or a parent on the same filesystem) so it can be renamed into place
+        max_size: Maximum size in bytes, defaults to MAX_UPLOAD_SIZE
+    
+    Returns:
+        The temporary file path, the first bytes of the upload, its SHA-256 hex
+        digest and its size
+    
+    Raises:
+        HTTPException: 413 as soon as the upload grows past `max_size`
+    """
+    max_size = settings.MAX_UPLOAD_SIZE if max_size is None else max_size
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    digest = hashlib.sha256()
+    head = b""
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large, the maximum size is {max_size} bytes",
+                    )
+                if len(head) < 16:
+                    head += chunk[:16 - len(head)]
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+    except BaseException:
+        _remove_quietly(temp_path)
+        raise
+    finally:
+        await file.close()
+    return temp_path, head, digest.hexdigest(), size
+
+
+def _store_by_hash(temp_path: str, directory: str, sha256: str, extension: str) -> Tuple[str, str]:
+    """
+    Move a temporary file to `directory/<first 2 hex>/<sha256><extension>`.
+    If that file already exists the content is identical, so the temporary
+    copy is dropped and the existing one is reused.
+    
+    Returns:
+        The name relative to `directory` and the full path
+    """
+    name = os.path.join(sha256[:2], f"{sha256}{extension}")
+    path = os.path.join(directory, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        _remove_quietly(temp_path)
+        # Refresh the mtime so the garbage collector's grace period starts again
+        os.utime(path)
+    else:
+        # mkstemp creates the file with mode 0600; uploads are served as static files
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    return name.replace(os.sep, "/"), path
+
+
+async def save_image_upload(
+    file: UploadFile,
+    directory: str,
+    before_store: Optional[Callable[[str, str, int], None]] = None,
+) -> StoredUpload:
+    """
+    Stream an image upload into `directory`, stored under its SHA-256 so the
+    same image is only kept once. The format comes from the file contents,
+    never from the client's content type or filename.
+    
+    Args:
+        file: The uploaded file
+        directory: The destination directory
+        before_store: Called in the threadpool with the name, SHA-256 and size
+            before the file is stored, to take a reference on it first: an
+            identical file that is already stored may otherwise be collected
+            as unused right after being reused
+    
+    Returns:
+        StoredUpload: The stored file; the extension matches the detected format
+    
+    Raises:
+        HTTPException: 400 if the file is not a JPEG, PNG, GIF or WebP image,
+            413 if it is larger than MAX_UPLOAD_SIZE
+    """
+    temp_path, head, sha256, size = await stream_to_temp_file(file, directory)
+    extension = sniff_image_extension(head)
+    if extension is None:
+        _remove_quietly(temp_path)
+        raise HTTPException(status_code=400, detail="The file must be a JPEG, PNG, GIF or WebP image")
+    
+    if before_store is not None:
+        name = f"{sha256[:2]}/{sha256}{extension}"
+        try:
+            await run_in_threadpool(before_store, name, sha256, size)
+        except BaseException:
+            _remove_quietly(temp_path)
+            raise
+    
+    name, path = await run_in_threadpool(_store_by_hash, temp_path, directory, sha256, extension)
+    return StoredUpload(name=name, path=path, sha256=sha256, size=size)
 
 
 async def save_upload_file(file: UploadFile, folder: Optional[str] = None) -> str:
     """
-    Save an uploaded file to the uploads directory and return the path
+    Save an uploaded file to the uploads directory and return the path.
+    Files are stored under their SHA-256, so identical uploads share one file.
     
     Args:
         file: The uploaded file
@@ -20,29 +178,24 @@ async def save_upload_file(file: UploadFile, folder: Optional[str] = None) -> st
     if not file:
         raise HTTPException(status_code=400, detail="No file provided")
     
-    # Generate a unique filename to prevent conflicts
-    file_ext = os.path.splitext(file.filename)[1] if file.filename else ""
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    
     # Create the directory path
     upload_dir = os.path.join(settings.STATIC_PATH, settings.UPLOAD_FOLDER)
     if folder:
         upload_dir = os.path.join(upload_dir, folder)
     
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    # Save the file
-    file_path = os.path.join(upload_dir, unique_filename)
+    # Save the file in chunks, then move it into place
+    temp_path, head, sha256, _ = await stream_to_temp_file(file, upload_dir)
+    file_ext = sniff_image_extension(head)
+    if file_ext is None:
+        file_ext = os.path.splitext(file.filename)[1] if file.filename else ""
+    name, file_path = _store_by_hash(temp_path, upload_dir, sha256, file_ext)
     
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    finally:
-        await file.close()
+    # Images also get resized variants, named <file>_<variant>.webp/.jpg
+    if sniff_image_extension(head):
+        image_variant_generator.submit_file(file_path)
     
     # Return the path relative to the static directory
-    relative_path = os.path.join(settings.UPLOAD_FOLDER, folder or "", unique_filename) if folder else os.path.join(settings.UPLOAD_FOLDER, unique_filename)
-    return relative_path
+    return os.path.join(settings.UPLOAD_FOLDER, folder or "", name) if folder else os.path.join(settings.UPLOAD_FOLDER, name)
 
 
 def delete_file(file_path: str) -> bool:
@@ -0,0 +1,37 @@
+import os
+import tempfile
+from typing import Any
+
+from PIL import Image
+
+
+def has_alpha(image: Image.Image) -> bool:
+    """Whether an image carries transparency, as an alpha band or a palette entry"""
+    return image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+
+def to_jpeg_mode(image: Image.Image) -> Image.Image:
+    """Convert an image to RGB for JPEG; transparent images are flattened onto white"""
+    if not has_alpha(image):
+        return image.convert("RGB")
+    # JPEG has no alpha channel: flatten onto white
+    image = image.convert("RGBA")
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def save_atomically(image: Image.Image, path: str, format: str, **options: Any) -> None:
+    """
+    Write an image through a temporary file in the same directory, so readers
+    never see a partly written file at `path`
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".render-")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            image.save(buffer, format, **options)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
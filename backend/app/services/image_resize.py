@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from PIL import Image, ImageOps
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.services.image_io import save_atomically, to_jpeg_mode
+from app.services.process_pool import spawn_process_pool
+
+# Output formats: Pillow format name, file extension and media type
+FORMATS = {
+    "webp": ("WEBP", ".webp", "image/webp"),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg"),
+    "png": ("PNG", ".png", "image/png"),
+}
+
+
+def resize_image(source_path: str, dest_path: str, width: Optional[int], height: Optional[int], fmt: str) -> int:
+    """
+    Fit an image inside `width` x `height` (either may be None) without
+    upscaling it, and write it atomically to `dest_path`. Runs in the worker
+    processes.
+
+    Returns:
+        int: The size of the written file in bytes
+    """
+    format_name = FORMATS[fmt][0]
+    with Image.open(source_path) as original:
+        original.seek(0)
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((width or image.width, height or image.height), Image.Resampling.LANCZOS)
+
+        if format_name == "JPEG":
+            image = to_jpeg_mode(image)
+            options: Dict[str, Any] = {"quality": settings.IMAGE_VARIANT_QUALITY, "optimize": True, "progressive": True}
+        elif format_name == "WEBP":
+            options = {"quality": settings.IMAGE_VARIANT_QUALITY, "method": 4}
+        else:
+            options = {"optimize": True}
+
+        save_atomically(image, dest_path, format_name, **options)
+    return os.path.getsize(dest_path)
+
+
+class ResizedImageCache:
+    """
+    On-disk cache of resized images, evicted least recently used first once
+    the files add up to more than `max_bytes`.
+
+    The index (file name -> size, in use order) lives in memory and is rebuilt
+    from the directory on start, oldest access time first. Renders run in a
+    process pool; concurrent requests for the same rendition wait for a single
+    render instead of starting their own.
+
+    The index is shared with the threadpool, so it is guarded by a lock; the
+    in-flight renders are only touched from the event loop.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, workers: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._rendering: Dict[str, "asyncio.Task[str]"] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = spawn_process_pool(self.workers)
+        return self._executor
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name[:2], name)
+
+    def load(self) -> None:
+        """Index the files already on disk, least recently used first"""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if file_name.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(root, file_name))
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_atime, file_name, stat.st_size))
+        found.sort()
+        with self._lock:
+            self._entries = OrderedDict((file_name, size) for _, file_name, size in found)
+            self.total_bytes = sum(self._entries.values())
+            self._loaded = True
+        self._evict()
+
+    def key(self, source_path: str, width: Optional[int], height: Optional[int], fmt: str) -> str:
+        """
+        The cache file name of a rendition. The source size and mtime are part
+        of the key, so a replaced source never serves a stale rendition.
+        """
+        stat = os.stat(source_path)
+        raw = f"{source_path}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{height}|{fmt}"
+        return hashlib.sha256(raw.encode()).hexdigest() + FORMATS[fmt][1]
+
+    def _lookup(self, name: str) -> Optional[str]:
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = self._path(name)
+        if os.path.exists(path):
+            return path
+        # Deleted behind our back
+        with self._lock:
+            self.total_bytes -= self._entries.pop(name, 0)
+        return None
+
+    def _add(self, name: str, size: int) -> None:
+        with self._lock:
+            self.total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+        self._evict(keep=name)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        while True:
+            with self._lock:
+                if self.total_bytes <= self.max_bytes or not self._entries:
+                    return
+                name, size = next(iter(self._entries.items()))
+                if name == keep:
+                    # The newest file alone is larger than the limit
+                    return
+                del self._entries[name]
+                self.total_bytes -= size
+                self.evictions += 1
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+
+    async def _render(self, name: str, source_path: str, width: Optional[int], height: Optional[int], fmt: str) -> str:
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.workers <= 0:
+            size = await run_in_threadpool(resize_image, source_path, path, width, height, fmt)
+        else:
+            loop = asyncio.get_running_loop()
+            size = await loop.run_in_executor(self._get_executor(), resize_image, source_path, path, width, height, fmt)
+        await run_in_threadpool(self._add, name, size)
+        return path
+
+    async def get(self, source_path: str, width: Optional[int], height: Optional[int], fmt: str) -> str:
+        """
+        The path of the rendition, rendering it first if it is not cached
+
+        Args:
+            source_path: The original image
+            width: Maximum width, or None
+            height: Maximum height, or None
+            fmt: One of FORMATS
+
+        Returns:
+            str: The path of the cached file
+        """
+        if not self._loaded:
+            await run_in_threadpool(self.load)
+
+        name = self.key(source_path, width, height, fmt)
+        path = self._lookup(name)
+        if path is not None:
+            self.hits += 1
+            return path
+
+        task = self._rendering.get(name)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._render(name, source_path, width, height, fmt))
+            self._rendering[name] = task
+            task.add_done_callback(lambda _: self._rendering.pop(name, None))
+        # shield: a client that disconnects must not cancel the render for the others
+        return await asyncio.shield(task)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the cache counters
+
+        Returns:
+            dict: Files and bytes on disk, hits, misses, coalesced requests and evictions
+        """
+        with self._lock:
+            files = len(self._entries)
+        return {
+            "files": files,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "rendering": len(self._rendering),
+        }
+
+
+resized_image_cache = ResizedImageCache(
+    directory=settings.IMAGE_CACHE_PATH,
+    max_bytes=settings.IMAGE_CACHE_MAX_BYTES,
+    workers=settings.IMAGE_RESIZE_WORKERS,
+)
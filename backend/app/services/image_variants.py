@@ -0,0 +1,212 @@
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional
+
+from PIL import Image, ImageOps
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.db_models import ArticuloInventario
+from app.services.catalog_cache import catalog_cache
+from app.services.image_io import has_alpha, save_atomically, to_jpeg_mode
+from app.services.process_pool import spawn_process_pool
+
+logger = logging.getLogger(__name__)
+
+_articulos = ArticuloInventario.__table__
+
+STATIC_URL_PREFIX = "/static/"
+
+
+def url_to_path(url: Optional[str]) -> Optional[str]:
+    """Map a /static/... URL to its file, or None for external URLs"""
+    if not url or not url.startswith(STATIC_URL_PREFIX):
+        return None
+    relative = os.path.normpath(url[len(STATIC_URL_PREFIX):])
+    if relative.startswith(".."):
+        return None
+    return os.path.join(settings.STATIC_PATH, relative)
+
+
+def path_to_url(path: str) -> str:
+    return STATIC_URL_PREFIX + os.path.relpath(path, settings.STATIC_PATH).replace(os.sep, "/")
+
+
+def render_variants(source_path: str, widths: Mapping[str, int], quality: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Write a WebP and a JPEG copy of an image for every variant width, next to
+    the source file. Images are never upscaled. Runs in the worker processes.
+
+    Uploads are stored under their content hash, so variants that already
+    exist for the same file name are reused instead of rendered again.
+
+    Args:
+        source_path: The original image
+        widths: Maximum width per variant name
+        quality: Encoder quality for both formats
+
+    Returns:
+        dict: Per variant name, its size and the paths of the WebP and JPEG files
+    """
+    stem = os.path.splitext(source_path)[0]
+    variants = {}
+    for name in widths:
+        webp_path, jpeg_path = f"{stem}_{name}.webp", f"{stem}_{name}.jpg"
+        if not (os.path.exists(webp_path) and os.path.exists(jpeg_path)):
+            break
+        with Image.open(webp_path) as existing:
+            variants[name] = {
+                "width": existing.width,
+                "height": existing.height,
+                "webp": webp_path,
+                "jpeg": jpeg_path,
+            }
+    else:
+        return variants
+
+    variants = {}
+    with Image.open(source_path) as original:
+        original.seek(0)
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if has_alpha(image) else "RGB")
+
+        for name, width in sorted(widths.items(), key=lambda item: item[1]):
+            variant = image.copy()
+            variant.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+
+            webp_path = f"{stem}_{name}.webp"
+            save_atomically(variant, webp_path, "WEBP", quality=quality, method=4)
+
+            variant = to_jpeg_mode(variant)
+            jpeg_path = f"{stem}_{name}.jpg"
+            save_atomically(variant, jpeg_path, "JPEG", quality=quality, optimize=True, progressive=True)
+
+            variants[name] = {
+                "width": variant.width,
+                "height": variant.height,
+                "webp": webp_path,
+                "jpeg": jpeg_path,
+            }
+    return variants
+
+
+def pick_variant(variants: Optional[Mapping[str, Mapping[str, Any]]], width: int) -> Optional[Mapping[str, Any]]:
+    """
+    The smallest variant at least `width` pixels wide, or the largest one if
+    none is wide enough
+    """
+    if not variants:
+        return None
+    by_width = sorted(variants.values(), key=lambda variant: variant["width"])
+    for variant in by_width:
+        if variant["width"] >= width:
+            return variant
+    return by_width[-1]
+
+
+class ImageVariantGenerator:
+    """
+    Produce resized variants of uploaded images in the background.
+
+    Decoding and resizing are CPU bound, so they run in a process pool. One
+    thread per worker process waits for the results and stores the variant URLs
+    on the article, so `workers` renders run at once; the upload request never
+    waits for either.
+    """
+
+    def __init__(self, widths: Mapping[str, int], quality: int, workers: int):
+        self.widths = dict(widths)
+        self.quality = quality
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._store_executor: Optional[ThreadPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = spawn_process_pool(self.workers)
+        return self._executor
+
+    def _get_store_executor(self) -> ThreadPoolExecutor:
+        if self._store_executor is None:
+            self._store_executor = ThreadPoolExecutor(
+                max_workers=max(self.workers, 1),
+                thread_name_prefix="image-variants",
+            )
+        return self._store_executor
+
+    def render(self, source_path: str) -> Dict[str, Dict[str, Any]]:
+        """Render the variants of a file and wait for them; see `render_variants`"""
+        if self.workers <= 0:
+            return render_variants(source_path, self.widths, self.quality)
+        return self._get_executor().submit(render_variants, source_path, self.widths, self.quality).result()
+
+    def submit_file(self, source_path: str) -> Future:
+        """Render the variants of a file in the background, without storing them anywhere"""
+        return self._get_store_executor().submit(self._render_logged, source_path)
+
+    def submit_articulo(self, articulo_id: int, image_url: str) -> Future:
+        """
+        Render the variants of an article's image in the background and store
+        their URLs in `image_variants`, unless the image was replaced meanwhile
+        """
+        return self._get_store_executor().submit(self.generate_for_articulo, articulo_id, image_url)
+
+    def _render_logged(self, source_path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        try:
+            return self.render(source_path)
+        except Exception:
+            logger.exception("Could not render image variants for %s", source_path)
+            return None
+
+    def generate_for_articulo(self, articulo_id: int, image_url: str) -> bool:
+        """
+        Render and store the variants of an article's image
+
+        Returns:
+            bool: True if the variants were stored
+        """
+        source_path = url_to_path(image_url)
+        if source_path is None:
+            return False
+        rendered = self._render_logged(source_path)
+        if rendered is None:
+            return False
+
+        variants = {
+            name: {
+                "width": variant["width"],
+                "height": variant["height"],
+                "webp": path_to_url(variant["webp"]),
+                "jpeg": path_to_url(variant["jpeg"]),
+            }
+            for name, variant in rendered.items()
+        }
+        with engine.begin() as conn:
+            result = conn.execute(
+                update(_articulos)
+                .where(_articulos.c.id == articulo_id)
+                .where(_articulos.c.image_url == image_url)
+                .values(image_variants=variants, fecha_actualizacion=datetime.utcnow())
+            )
+        if result.rowcount != 1:
+            return False
+        catalog_cache.invalidate([articulo_id])
+        return True
+
+    def shutdown(self) -> None:
+        if self._store_executor is not None:
+            self._store_executor.shutdown(wait=False, cancel_futures=True)
+            self._store_executor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_variant_generator = ImageVariantGenerator(
+    widths=settings.IMAGE_VARIANT_WIDTHS,
+    quality=settings.IMAGE_VARIANT_QUALITY,
+    workers=settings.IMAGE_VARIANT_WORKERS,
+)
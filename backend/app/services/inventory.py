@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional
+
+from sqlalchemy import bindparam, select, update
+from sqlmodel import Session
+
+from app.models.db_models import ArticuloInventario
+
+_articulos = ArticuloInventario.__table__
+
+# Check and decrement in one statement: the row only changes if enough stock is
+# left, so concurrent orders for the same article can never oversell it
+_reserve_stmt = (
+    update(_articulos)
+    .where(_articulos.c.id == bindparam("_articulo_id"))
+    .where(_articulos.c.cantidad >= bindparam("_cantidad"))
+    .values(
+        cantidad=_articulos.c.cantidad - bindparam("_cantidad"),
+        fecha_actualizacion=bindparam("_ahora"),
+    )
+)
+
+_release_stmt = (
+    update(_articulos)
+    .where(_articulos.c.id == bindparam("_articulo_id"))
+    .values(
+        cantidad=_articulos.c.cantidad + bindparam("_cantidad"),
+        fecha_actualizacion=bindparam("_ahora"),
+    )
+)
+
+
+def reserve_stock(db: Session, articulo_id: int, cantidad: int, ahora: Optional[datetime] = None) -> bool:
+    """
+    Take `cantidad` units of an article if they are available
+
+    Args:
+        db: The session whose transaction the update joins
+        articulo_id: The article id
+        cantidad: Units to take, must be positive
+
+    Returns:
+        bool: False if the article does not exist or has less stock
+    """
+    return reserve_stock_many(db, {articulo_id: cantidad}, ahora) == []
+
+
+def reserve_stock_many(db: Session, cantidades: Mapping[int, int], ahora: Optional[datetime] = None) -> List[int]:
+    """
+    Take stock for several articles in the current transaction, with one
+    executemany of the conditional UPDATE
+
+    The caller must roll back when anything is returned, since the articles
+    that did have stock were already decremented.
+
+    Returns:
+        list: The ids of the articles without enough stock, empty on success
+    """
+    if not cantidades:
+        return []
+    ahora = ahora or datetime.utcnow()
+    result = db.execute(
+        _reserve_stmt,
+        [
+            {"_articulo_id": articulo_id, "_cantidad": cantidad, "_ahora": ahora}
+            for articulo_id, cantidad in cantidades.items()
+        ],
+    )
+    if result.rowcount == len(cantidades):
+        return []
+
+    # Only on failure: the rows this call updated carry its `ahora`
+    reservados = set(
+        db.execute(
+            select(_articulos.c.id)
+            .where(_articulos.c.id.in_(list(cantidades)))
+            .where(_articulos.c.fecha_actualizacion == ahora)
+        ).scalars()
+    )
+    sin_stock = [articulo_id for articulo_id in cantidades if articulo_id not in reservados]
+    # Same timestamp written by someone else at the same microsecond: still a failure
+    return sin_stock or list(cantidades)
+
+
+def release_stock(db: Session, cantidades: Mapping[int, int], ahora: Optional[datetime] = None) -> None:
+    """Give stock back, e.g. when a reservation expires"""
+    if not cantidades:
+        return
+    ahora = ahora or datetime.utcnow()
+    db.execute(
+        _release_stmt,
+        [
+            {"_articulo_id": articulo_id, "_cantidad": cantidad, "_ahora": ahora}
+            for articulo_id, cantidad in cantidades.items()
+        ],
+    )
+
+
+def get_available_stock(db: Session, articulo_ids: List[int]) -> Dict[int, int]:
+    """Current stock of the given articles, read with one IN query"""
+    rows = db.execute(
+        select(_articulos.c.id, _articulos.c.cantidad).where(_articulos.c.id.in_(articulo_ids))
+    ).all()
+    return {articulo_id: cantidad for articulo_id, cantidad in rows}
@@ -0,0 +1,104 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, update
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.db_models import Usuario
+
+logger = logging.getLogger(__name__)
+
+
+class LastAccessTracker:
+    """
+    Collect `fecha_ultimo_acceso` timestamps in memory and write them in batches.
+
+    Authenticated requests only record the timestamp; a background thread flushes
+    the pending values with a single executemany UPDATE every `flush_interval`
+    seconds, or as soon as `max_pending` distinct users are waiting.
+    """
+
+    def __init__(self, flush_interval: float, max_pending: int):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def touch(self, user_id: int, when: Optional[datetime] = None) -> None:
+        """
+        Record an access for a user without touching the database
+
+        Args:
+            user_id: The id of the user
+            when: The access time, defaults to now
+        """
+        with self._lock:
+            self._pending[user_id] = when or datetime.utcnow()
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Write all pending timestamps in one transaction
+
+        Returns:
+            int: The number of users updated
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        stmt = (
+            update(Usuario.__table__)
+            .where(Usuario.__table__.c.id == bindparam("_user_id"))
+            .values(fecha_ultimo_acceso=bindparam("_accessed"))
+        )
+        params = [{"_user_id": user_id, "_accessed": accessed} for user_id, accessed in pending.items()]
+        try:
+            with engine.begin() as conn:
+                conn.execute(stmt, params)
+        except Exception:
+            logger.exception("Could not flush last access timestamps")
+            # Keep the values so the next flush retries them, unless newer ones arrived
+            with self._lock:
+                for user_id, accessed in pending.items():
+                    self._pending.setdefault(user_id, accessed)
+            return 0
+        return len(pending)
+
+    def start(self) -> None:
+        """Start the background flush thread"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="last-access-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and flush whatever is still pending"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+last_access_tracker = LastAccessTracker(
+    flush_interval=settings.LAST_ACCESS_FLUSH_INTERVAL,
+    max_pending=settings.LAST_ACCESS_FLUSH_MAX_PENDING,
+)
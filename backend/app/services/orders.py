@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.models.db_models import Pedido, PedidoArticulo
+
+
+def create_order_with_lines(
+    db: Session,
+    usuario_id: int,
+    cantidades: Mapping[int, int],
+    precios: Mapping[int, float],
+    direccion_envio: Optional[str] = None,
+    notas: Optional[str] = None,
+    ahora: Optional[datetime] = None,
+) -> Tuple[Pedido, List[Dict]]:
+    """
+    Insert a Pedido and all of its PedidoArticulo rows in the current transaction.
+    The total is computed here from the given prices; stock must already be
+    reserved by the caller, and the caller commits.
+
+    Args:
+        db: The session to use
+        usuario_id: The owner of the order
+        cantidades: Units per article id
+        precios: Unit price per article id
+
+    Returns:
+        The flushed Pedido and the inserted lines as dicts
+    """
+    ahora = ahora or datetime.utcnow()
+    total = sum(precios[articulo_id] * cantidad for articulo_id, cantidad in cantidades.items())
+
+    db_pedido = Pedido(
+        usuario_id=usuario_id,
+        total=round(total, 2),
+        estado="pendiente",
+        direccion_envio=direccion_envio,
+        notas=notas,
+        fecha_pedido=ahora,
+    )
+    db.add(db_pedido)
+    db.flush()
+
+    lineas = [
+        {
+            "pedido_id": db_pedido.id,
+            "articulo_id": articulo_id,
+            "cantidad": cantidad,
+            "precio_unitario": precios[articulo_id],
+        }
+        for articulo_id, cantidad in cantidades.items()
+    ]
+    # executemany: one statement for every line
+    db.execute(insert(PedidoArticulo.__table__), lineas)
+
+    return db_pedido, lineas
@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor
+
+    Args:
+        values: The sort key values, ending with the row id
+
+    Returns:
+        str: A URL-safe cursor string
+    """
+    raw = json.dumps(
+        [value.isoformat() if isinstance(value, datetime) else value for value in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> List[Any]:
+    """
+    Decode a cursor produced by `encode_cursor`
+
+    Args:
+        cursor: The cursor received from the client
+        types: One converter per value (e.g. `int`, `datetime.fromisoformat`)
+
+    Returns:
+        list: The converted sort key values
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return [convert(value) for convert, value in zip(types, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+
+
+def apply_keyset(query, columns: Sequence[Any], cursor_values: Optional[Sequence[Any]], descending: bool = False):
+    """
+    Order a query by the given columns and, when a cursor is given, keep only
+    the rows after it. The last column must be unique (the primary key) so the
+    order is total and no row is skipped or repeated between pages.
+
+    The WHERE clause is a row-value comparison, so SQLite seeks straight to the
+    cursor position through the index instead of scanning the skipped rows.
+    """
+    if cursor_values is not None:
+        if len(columns) == 1:
+            condition = columns[0] < cursor_values[0] if descending else columns[0] > cursor_values[0]
+        else:
+            key = tuple_(*columns)
+            values = tuple_(*cursor_values)
+            condition = key < values if descending else key > values
+        query = query.where(condition)
+
+    return query.order_by(*[column.desc() if descending else column for column in columns])
+
+
+def set_next_cursor(response: Response, rows: Sequence[Any], limit: int, key: Callable[[Any], Sequence[Any]]) -> Optional[str]:
+    """
+    Add the `X-Next-Cursor` header when the page is full
+
+    Args:
+        response: The response to add the header to
+        rows: The rows of the current page
+        limit: The requested page size
+        key: Returns the sort key values of a row
+
+    Returns:
+        The next cursor, or None on the last page
+    """
+    if limit <= 0 or len(rows) < limit:
+        return None
+    next_cursor = encode_cursor(*key(rows[-1]))
+    response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return next_cursor
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.core import security
+from app.core.config import settings
+from app.services.process_pool import spawn_process_pool
+
+
+class PasswordHasher:
+    """
+    Run bcrypt hashing and verification in a bounded process pool.
+
+    bcrypt is deliberately slow; running it on the anyio worker threads lets a
+    burst of logins starve every other sync endpoint. Here it runs in separate
+    processes, and once `workers + max_queue` operations are outstanding new
+    ones are rejected with 503 and a Retry-After header instead of piling up.
+
+    Counters are only touched from the event loop, so they need no locking.
+    """
+
+    def __init__(self, workers: int, max_queue: int, retry_after: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self._latencies = deque(maxlen=1024)
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = spawn_process_pool(self.workers)
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.in_flight >= max(self.workers, 1) + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servicio de autenticación saturado, inténtelo de nuevo",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(func, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.in_flight -= 1
+            self.completed += 1
+            self._latencies.append(elapsed)
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(security.verify_password, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the pool metrics
+
+        Returns:
+            dict: Queue depth, in-flight operations, counters and latency in milliseconds
+        """
+        recent = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000
+
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - max(self.workers, 1)),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_ms_avg": (self._latency_total / self.completed * 1000) if self.completed else 0.0,
+            "latency_ms_p50": percentile(0.50),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": self._latency_max * 1000,
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER,
+)
@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.models.db_models import Usuario
+from app.services.cache import TTLCache
+
+
+class PrincipalCache:
+    """
+    Cache of JWT -> (decoded claims, Usuario snapshot).
+
+    A warm entry lets `get_current_user` skip both the signature check and the
+    `usuarios` lookup. Entries never outlive the token's `exp` claim, and every
+    entry of a user is dropped as soon as that user is updated or deleted: each
+    entry remembers the user's generation number when it was stored, and
+    `invalidate_user` bumps that number.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, user_id: int) -> int:
+        return self._generations.get(user_id, 0)
+
+    def get(self, token: str) -> Optional[Tuple[Dict[str, Any], Usuario]]:
+        """
+        Look up a token
+
+        Returns:
+            The decoded claims and a fresh, detached Usuario built from the
+            snapshot, or None when the token is not cached or is stale
+        """
+        entry = self._cache.get(token)
+        if entry is None:
+            return None
+        claims, snapshot, generation = entry
+        if generation != self.generation(snapshot["id"]):
+            self._cache.pop(token)
+            return None
+        return claims, Usuario(**snapshot)
+
+    def set(self, token: str, claims: Dict[str, Any], user: Usuario, generation: int) -> None:
+        """
+        Store a resolved principal
+
+        Args:
+            token: The raw bearer token
+            claims: The decoded JWT claims
+            user: The user loaded from the database
+            generation: The value of `generation(user.id)` read before the user was loaded
+        """
+        ttl = self._cache.ttl
+        exp = claims.get("exp")
+        if exp is not None:
+            ttl = min(ttl, float(exp) - time.time())
+        if ttl <= 0:
+            return
+        snapshot = {column.name: getattr(user, column.name) for column in Usuario.__table__.columns}
+        self._cache.set(token, (dict(claims), snapshot, generation), ttl=ttl)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached token of a user"""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+principal_cache = PrincipalCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+)
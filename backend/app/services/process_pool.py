@@ -0,0 +1,10 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def spawn_process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    A process pool whose workers are started with spawn: forking a process
+    that already runs threads is not safe
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
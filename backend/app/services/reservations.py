@@ -0,0 +1,199 @@
+import heapq
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.db_models import ReservaInventario
+from app.services.catalog_cache import catalog_cache
+from app.services.inventory import release_stock, reserve_stock
+
+logger = logging.getLogger(__name__)
+
+_reservas = ReservaInventario.__table__
+
+
+class ReservationManager:
+    """
+    Time-limited stock holds (cart reservations).
+
+    Placing a hold takes the units out of `articulos_inventario.cantidad` right
+    away with the same conditional UPDATE as an order, so `cantidad` always is
+    the stock still available to everyone else and no other path has to know
+    about holds. Each hold is also a row in `reservas_inventario`.
+
+    Expiry times live in a min-heap, so placing a hold and finding the next one
+    to expire are O(log n). A background thread pops every expired hold, deletes
+    their rows and gives their stock back in one transaction per batch. Holds that
+    were checked out or released early stay in the heap and are skipped when
+    popped.
+
+    Each process sweeps the holds it created, plus every hold found in the
+    database when it starts.
+    """
+
+    def __init__(self, ttl_seconds: int, sweep_interval: float, sweep_batch: int):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self._heap: List[Tuple[datetime, int]] = []
+        self._active: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _track(self, reserva_id: int, expira: datetime) -> None:
+        with self._lock:
+            self._active[reserva_id] = expira
+            heapq.heappush(self._heap, (expira, reserva_id))
+
+    def forget(self, reserva_ids: Iterable[int]) -> None:
+        """Stop tracking holds that were checked out or released"""
+        with self._lock:
+            for reserva_id in reserva_ids:
+                self._active.pop(reserva_id, None)
+
+    def load(self) -> None:
+        """Track every hold already in the database (e.g. after a restart)"""
+        with Session(engine) as db:
+            rows = db.exec(select(ReservaInventario.id, ReservaInventario.fecha_expiracion)).all()
+        with self._lock:
+            for reserva_id, expira in rows:
+                self._active[reserva_id] = expira
+            self._heap = [(expira, reserva_id) for reserva_id, expira in self._active.items()]
+            heapq.heapify(self._heap)
+
+    def place(self, db: Session, usuario_id: int, articulo_id: int, cantidad: int) -> Optional[ReservaInventario]:
+        """
+        Hold `cantidad` units of an article for a user
+
+        Returns:
+            The new hold, or None if there is not enough stock
+        """
+        ahora = datetime.utcnow()
+        if not reserve_stock(db, articulo_id, cantidad, ahora):
+            db.rollback()
+            return None
+
+        reserva = ReservaInventario(
+            usuario_id=usuario_id,
+            articulo_id=articulo_id,
+            cantidad=cantidad,
+            fecha_creacion=ahora,
+            fecha_expiracion=ahora + self.ttl,
+        )
+        db.add(reserva)
+        db.commit()
+        db.refresh(reserva)
+
+        self._track(reserva.id, reserva.fecha_expiracion)
+        catalog_cache.invalidate([articulo_id])
+        return reserva
+
+    def release(self, db: Session, reserva: ReservaInventario) -> bool:
+        """
+        Cancel a hold and give its stock back
+
+        Returns:
+            bool: False if the hold was already gone (expired or checked out)
+        """
+        reserva_id, articulo_id, cantidad = reserva.id, reserva.articulo_id, reserva.cantidad
+        result = db.execute(delete(_reservas).where(_reservas.c.id == reserva_id))
+        if result.rowcount != 1:
+            db.rollback()
+            return False
+        release_stock(db, {articulo_id: cantidad})
+        db.commit()
+
+        self.forget([reserva_id])
+        catalog_cache.invalidate([articulo_id])
+        return True
+
+    def sweep(self, ahora: Optional[datetime] = None) -> int:
+        """
+        Release expired holds, at most `sweep_batch` per transaction
+
+        Returns:
+            int: The number of holds released
+        """
+        ahora = ahora or datetime.utcnow()
+        released = 0
+        while True:
+            with self._lock:
+                batch = []
+                while self._heap and self._heap[0][0] <= ahora and len(batch) < self.sweep_batch:
+                    expira, reserva_id = heapq.heappop(self._heap)
+                    if self._active.get(reserva_id) == expira:
+                        batch.append(reserva_id)
+            if not batch:
+                return released
+
+            cantidades: Dict[int, int] = defaultdict(int)
+            try:
+                with Session(engine) as db:
+                    rows = db.exec(
+                        select(ReservaInventario.id, ReservaInventario.articulo_id, ReservaInventario.cantidad)
+                        .where(ReservaInventario.id.in_(batch))
+                    ).all()
+                    for reserva_id, articulo_id, cantidad in rows:
+                        # Conditional per row: a checkout may have taken the hold meanwhile
+                        result = db.execute(
+                            delete(_reservas)
+                            .where(_reservas.c.id == reserva_id)
+                            .where(_reservas.c.fecha_expiracion <= ahora)
+                        )
+                        if result.rowcount == 1:
+                            cantidades[articulo_id] += cantidad
+                            released += 1
+                    release_stock(db, cantidades, ahora)
+                    db.commit()
+            except Exception:
+                # Put the batch back so the next sweep retries it
+                with self._lock:
+                    for reserva_id in batch:
+                        if reserva_id in self._active:
+                            heapq.heappush(self._heap, (self._active[reserva_id], reserva_id))
+                raise
+
+            self.forget(batch)
+            if cantidades:
+                catalog_cache.invalidate(cantidades)
+
+    def start(self) -> None:
+        """Load the existing holds and start the expiry sweeper"""
+        if self._thread is not None:
+            return
+        self.load()
+        self._stopping = False
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping:
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Could not release expired reservations")
+            self._wakeup.wait(self.sweep_interval)
+
+
+reservation_manager = ReservationManager(
+    ttl_seconds=settings.HOLD_TTL_SECONDS,
+    sweep_interval=settings.HOLD_SWEEP_INTERVAL,
+    sweep_batch=settings.HOLD_SWEEP_BATCH,
+)
@@ -0,0 +1,314 @@
+import gzip
+import os
+import re
+import stat
+import tempfile
+from mimetypes import guess_type
+from typing import Iterator, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from app.core.compression import accepted_encodings
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # In requirements.txt; without it only .gz files are produced and served
+    brotli = None
+
+# Media types worth compressing; images, video and archives already are
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "application/wasm",
+    "image/svg+xml",
+)
+
+# Precompressed siblings, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# A hex digest in the file name (sha256 uploads, "main.3f2a1b9c.js" bundles):
+# the content behind the name never changes, so clients may cache it forever
+HASHED_NAME = re.compile(r"(?:^|[._-])[0-9a-f]{8,}(?:[._-]|$)")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_compressible(media_type: Optional[str]) -> bool:
+    return bool(media_type) and media_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def cache_control_for(path: str) -> str:
+    return IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(os.path.basename(path)) else REVALIDATE_CACHE_CONTROL
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range
+
+    Returns:
+        The first and last byte positions (inclusive), or None if the header
+        is not a single byte range
+
+    Raises:
+        ValueError: If the range cannot be satisfied for a file of `size` bytes
+    """
+    match = _RANGE.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse that also answers single-range requests with 206.
+
+    The body is sent with the ASGI zero-copy extension when the server offers
+    it (the kernel copies the file straight to the socket), and otherwise read
+    in chunks off the event loop.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.headers["accept-ranges"] = "bytes"
+
+    def _range(self, scope: Scope, size: int) -> Optional[Tuple[int, int]]:
+        request_headers = Headers(scope=scope)
+        range_header = request_headers.get("range")
+        if not range_header or self.status_code != 200:
+            return None
+        if_range = request_headers.get("if-range")
+        if if_range is not None and if_range not in (self.headers.get("etag"), self.headers.get("last-modified")):
+            # The client's partial copy is stale: send everything
+            return None
+        return parse_range(range_header, size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.stat_result is None:
+            self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            self.set_stat_headers(self.stat_result)
+        size = self.stat_result.st_size
+
+        offset, count = 0, size
+        try:
+            byte_range = self._range(scope, size)
+        except ValueError:
+            response = Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+            await response(scope, receive, send)
+            return
+        if byte_range is not None:
+            start, end = byte_range
+            offset, count = start, end - start + 1
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(count)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": offset,
+                    "count": count,
+                    "more_body": False,
+                })
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(offset)
+                remaining = count
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining:
+                    # The file shrank under us; end the body anyway
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+        if self.background is not None:
+            await self.background()
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves `<file>.br` / `<file>.gz` when the client accepts
+    them and they are at least as new as the file, answers Range requests and
+    sets Cache-Control: immutable for content-hashed file names.
+
+    The compressed siblings are written by `python -m app.manage compress-static`.
+    """
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        # Weak comparison: the compression middleware turns the ETag into W/"..."
+        if_none_match = request_headers.get("if-none-match")
+        etag = response_headers.get("etag")
+        if if_none_match is not None and etag is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+        return super().is_not_modified(response_headers, request_headers)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = guess_type(str(full_path))[0] or "text/plain"
+        headers = {"cache-control": cache_control_for(str(full_path))}
+
+        serve_path, serve_stat, encoding = full_path, stat_result, None
+        if is_compressible(media_type):
+            headers["vary"] = "Accept-Encoding"
+            # Ranges refer to the identity encoding
+            if "range" not in request_headers:
+                accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+                for coding, suffix in ENCODINGS:
+                    if coding not in accepted:
+                        continue
+                    try:
+                        compressed_stat = os.stat(f"{full_path}{suffix}")
+                    except OSError:
+                        continue
+                    if stat.S_ISREG(compressed_stat.st_mode) and compressed_stat.st_mtime >= stat_result.st_mtime:
+                        serve_path, serve_stat, encoding = f"{full_path}{suffix}", compressed_stat, coding
+                        break
+
+        response = RangeFileResponse(
+            serve_path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=serve_stat,
+            method=scope["method"],
+        )
+        if encoding:
+            response.headers["content-encoding"] = encoding
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def _iter_compressible_files(root: str) -> Iterator[str]:
+    suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for directory, _, files in os.walk(root):
+        for file_name in files:
+            if file_name.startswith(".") or file_name.endswith(suffixes):
+                continue
+            path = os.path.join(directory, file_name)
+            if is_compressible(guess_type(path)[0]):
+                yield path
+
+
+def _write_atomically(path: str, data: bytes) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".compress-")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            buffer.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def precompress_static(root: Optional[str] = None, min_size: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Write .gz (and .br, if brotli is installed) next to every compressible
+    file of at least `min_size` bytes whose compressed copies are missing or
+    older. A copy that does not come out smaller is not kept.
+
+    Returns:
+        The number of files written and the number of files already up to date
+    """
+    root = root or settings.STATIC_PATH
+    min_size = settings.STATIC_PRECOMPRESS_MIN_SIZE if min_size is None else min_size
+    written = up_to_date = 0
+    for path in _iter_compressible_files(root):
+        source_stat = os.stat(path)
+        if source_stat.st_size < min_size:
+            continue
+        data = None
+        for coding, suffix in ENCODINGS:
+            if coding == "br" and brotli is None:
+                continue
+            target = f"{path}{suffix}"
+            try:
+                if os.stat(target).st_mtime >= source_stat.st_mtime:
+                    up_to_date += 1
+                    continue
+            except FileNotFoundError:
+                pass
+            if data is None:
+                with open(path, "rb") as source:
+                    data = source.read()
+            if coding == "br":
+                compressed = brotli.compress(data, quality=11)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) >= len(data):
+                continue
+            _write_atomically(target, compressed)
+            # Same mtime as the source, so freshness checks compare equal
+            os.utime(target, (source_stat.st_atime, source_stat.st_mtime))
+            written += 1
+    return written, up_to_date
+
+
+def render_nginx_include(static_root: str, backend_url: str) -> str:
+    """
+    An nginx snippet that serves /static straight from disk with the same
+    behaviour: precompressed files, Range, and immutable hashed names.
+    Resized images (/static/img/) still go to the backend.
+    """
+    static_root = static_root.rstrip("/")
+    backend_url = backend_url.rstrip("/")
+    if os.path.basename(static_root) == "static":
+        # root (unlike alias) is inherited safely by the nested regex location
+        document_root = f"root {os.path.dirname(static_root)};"
+    else:
+        document_root = f"alias {static_root}/;"
+    return f"""# Generated by `python -m app.manage nginx-static-conf`; do not edit by hand.
+# Include it inside the `server` block instead of proxying /static/ to the backend.
+
+location /static/img/ {{
+    proxy_pass {backend_url}/static/img/;
+    proxy_set_header Host $host;
+}}
+
+location /static/ {{
+    {document_root}
+    # Serves <file>.gz written by `manage compress-static`
+    gzip_static on;
+    # Needs the ngx_brotli module for <file>.br
+    # brotli_static on;
+    sendfile on;
+    tcp_nopush on;
+    add_header Vary Accept-Encoding;
+    add_header Cache-Control "{REVALIDATE_CACHE_CONTROL}";
+
+    location ~ "[/._-][0-9a-f]{{8,}}([._-][^/]*)?$" {{
+        add_header Vary Accept-Encoding;
+        add_header Cache-Control "{IMMUTABLE_CACHE_CONTROL}";
+    }}
+}}
+"""
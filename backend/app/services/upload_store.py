@@ -0,0 +1,204 @@
+import glob
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.db.session import engine
+from app.models.db_models import ArchivoSubido, ArticuloInventario
+from app.services.image_variants import url_to_path
+
+logger = logging.getLogger(__name__)
+
+_archivos = ArchivoSubido.__table__
+_articulos = ArticuloInventario.__table__
+
+
+def register_upload(db: Session, sha256: str, url: str, size: int, ahora: Optional[datetime] = None) -> None:
+    """
+    Record a stored upload, or refresh its last use if it is already known.
+    Joins the caller's transaction.
+    """
+    ahora = ahora or datetime.utcnow()
+    result = db.execute(
+        update(_archivos).where(_archivos.c.sha256 == sha256).values(fecha_ultimo_uso=ahora)
+    )
+    if result.rowcount:
+        return
+    try:
+        # Savepoint: a concurrent upload of the same file may insert it first
+        with db.begin_nested():
+            db.execute(
+                insert(_archivos).values(
+                    sha256=sha256, ruta=url, tamano=size, referencias=0,
+                    fecha_creacion=ahora, fecha_ultimo_uso=ahora,
+                )
+            )
+    except IntegrityError:
+        db.execute(
+            update(_archivos).where(_archivos.c.sha256 == sha256).values(fecha_ultimo_uso=ahora)
+        )
+
+
+def retain_upload(db: Session, url: Optional[str]) -> None:
+    """Count one more article pointing at `url`; untracked URLs are ignored"""
+    if url:
+        db.execute(
+            update(_archivos)
+            .where(_archivos.c.ruta == url)
+            .values(referencias=_archivos.c.referencias + 1, fecha_ultimo_uso=datetime.utcnow())
+        )
+
+
+def release_upload(db: Session, url: Optional[str]) -> None:
+    """Count one article less pointing at `url`; untracked URLs are ignored"""
+    if url:
+        db.execute(
+            update(_archivos)
+            .where(_archivos.c.ruta == url)
+            .values(
+                referencias=case((_archivos.c.referencias > 0, _archivos.c.referencias - 1), else_=0),
+                fecha_ultimo_uso=datetime.utcnow(),
+            )
+        )
+
+
+def _remove_file_and_variants(path: str) -> int:
+    """Delete a stored file and its resized variants, returning the bytes freed"""
+    stem = os.path.splitext(path)[0]
+    freed = 0
+    for candidate in [path] + glob.glob(glob.escape(stem) + "_*"):
+        try:
+            freed += os.path.getsize(candidate)
+            os.remove(candidate)
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+class UploadGarbageCollector:
+    """
+    Delete stored uploads that no article references any more.
+
+    The reference counts are kept up to date by the article endpoints, but
+    other paths (bulk import, manual edits) can change `image_url` too, so each
+    run first recounts them from `articulos_inventario`. A file is only deleted
+    after `grace_seconds` without use, which covers uploads whose article has
+    not been committed yet.
+
+    Only files registered in `archivos_subidos` are ever deleted.
+    """
+
+    def __init__(self, interval: float, grace_seconds: int):
+        self.interval = interval
+        self.grace = timedelta(seconds=grace_seconds)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+    def reconcile(self, db: Session) -> int:
+        """
+        Recompute every reference count from `ArticuloInventario.image_url`
+
+        Returns:
+            int: The number of counts that were wrong
+        """
+        referencias: Dict[str, int] = dict(
+            db.execute(
+                select(_articulos.c.image_url, func.count())
+                .where(_articulos.c.image_url.in_(select(_archivos.c.ruta)))
+                .group_by(_articulos.c.image_url)
+            ).all()
+        )
+        wrong = [
+            {"_ruta": ruta, "_referencias": referencias.get(ruta, 0)}
+            for ruta, actual in db.execute(select(_archivos.c.ruta, _archivos.c.referencias)).all()
+            if actual != referencias.get(ruta, 0)
+        ]
+        if wrong:
+            db.execute(
+                update(_archivos)
+                .where(_archivos.c.ruta == bindparam("_ruta"))
+                .values(referencias=bindparam("_referencias")),
+                wrong,
+            )
+        return len(wrong)
+
+    def collect(self, ahora: Optional[datetime] = None) -> Tuple[int, int]:
+        """
+        Delete the unreferenced uploads that are past the grace period
+
+        Returns:
+            The number of files deleted and the bytes freed
+        """
+        cutoff = (ahora or datetime.utcnow()) - self.grace
+        deleted = freed = 0
+        with Session(engine) as db:
+            self.reconcile(db)
+            db.commit()
+
+            candidates = db.execute(
+                select(_archivos.c.sha256, _archivos.c.ruta)
+                .where(_archivos.c.referencias == 0)
+                .where(_archivos.c.fecha_ultimo_uso < cutoff)
+            ).all()
+            for sha256, ruta in candidates:
+                # Conditional: the file may have been uploaded or referenced again meanwhile.
+                # The file is removed before the commit, while this transaction holds the
+                # write lock: an upload of the same file registers it (register_upload)
+                # before reusing it, so it waits for the removal or keeps the row alive
+                result = db.execute(
+                    delete(_archivos)
+                    .where(_archivos.c.sha256 == sha256)
+                    .where(_archivos.c.referencias == 0)
+                    .where(_archivos.c.fecha_ultimo_uso < cutoff)
+                )
+                path = url_to_path(ruta) if result.rowcount == 1 else None
+                try:
+                    if path is not None and datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+                        freed += _remove_file_and_variants(path)
+                        deleted += 1
+                except FileNotFoundError:
+                    pass
+                db.commit()
+        return deleted, freed
+
+    def start(self) -> None:
+        """Start the periodic collection thread"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._wakeup.clear()
+        self._thread = threading.Thread(target=self._run, name="upload-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wakeup.wait(self.interval)
+            if self._stopping:
+                break
+            try:
+                deleted, freed = self.collect()
+                if deleted:
+                    logger.info("Deleted %d unused uploads (%d bytes)", deleted, freed)
+            except Exception:
+                logger.exception("Could not collect unused uploads")
+
+
+upload_garbage_collector = UploadGarbageCollector(
+    interval=settings.UPLOAD_GC_INTERVAL,
+    grace_seconds=settings.UPLOAD_GC_GRACE_SECONDS,
+)
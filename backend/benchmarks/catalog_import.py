@@ -0,0 +1,80 @@
+"""
+Bulk catalog import against one POST /api/v1/products per item (user-013).
+
+Imports `--rows` products from a CSV through POST /api/v1/products/import,
+then imports the same file again so every row is an update. The per-item
+path is timed on `--sample` rows and extrapolated to `--rows`.
+
+    python -m benchmarks.catalog_import [--rows 100000] [--sample 1000]
+"""
+import argparse
+import csv
+import io
+import logging
+import time
+
+from benchmarks.common import print_table, use_scratch_environment
+
+
+def price_list(rows: int, prefix: str) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("sku", "nombre", "descripcion", "cantidad", "precio"))
+    for n in range(rows):
+        writer.writerow((f"{prefix}-{n:06d}", f"{prefix} artículo {n}", "Importado por el benchmark", 10 + n % 90, 1 + n % 500))
+    return buffer.getvalue().encode()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=1000)
+    args = parser.parse_args()
+
+    use_scratch_environment()
+    # One IN query and one executemany per chunk: repeated by design, not N+1
+    logging.getLogger("app.db.query_stats").setLevel(logging.ERROR)
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from benchmarks.common import user_headers
+
+    with TestClient(app) as client:
+        headers = user_headers("importa@bench.local", "admin")
+        content = price_list(args.rows, "BULK")
+
+        def bulk() -> float:
+            start = time.perf_counter()
+            response = client.post(
+                "/api/v1/products/import",
+                params={"clave": "sku"},
+                files={"file": ("precios.csv", content, "text/csv")},
+                headers=headers,
+            )
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200 and not response.json()["errores"], response.text[:500]
+            return elapsed
+
+        inserted = bulk()
+        updated = bulk()
+
+        start = time.perf_counter()
+        for n in range(args.sample):
+            articulo = {"sku": f"ITEM-{n:06d}", "nombre": f"ITEM artículo {n}", "cantidad": 10, "precio": 1.0}
+            assert client.post("/api/v1/products/", json=articulo).status_code == 200
+        per_item = (time.perf_counter() - start) / args.sample
+
+    print(f"{args.rows} rows, {len(content) / 2**20:.1f} MB of CSV; per item timed on {args.sample} rows")
+    print_table(
+        ("path", "seconds", "rows/s"),
+        [
+            ("bulk import, new rows", inserted, args.rows / inserted),
+            ("bulk import, updates", updated, args.rows / updated),
+            ("POST per item (extrapolated)", per_item * args.rows, 1 / per_item),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
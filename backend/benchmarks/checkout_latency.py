@@ -0,0 +1,76 @@
+"""
+Checkout latency by number of lines (user-009).
+
+Times an order of 1, 10 and 50 lines placed through POST /api/v1/orders/checkout
+and through the older sequence of POST /api/v1/orders plus one
+POST /api/v1/orders/{id}/articulos per line.
+
+    python -m benchmarks.checkout_latency [--repeat 30]
+"""
+import argparse
+
+from benchmarks.common import print_table, summary_ms, timings, use_scratch_environment
+
+LINE_COUNTS = (1, 10, 50)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    use_scratch_environment()
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app.db.session import engine
+    from app.main import app
+    from app.models.db_models import ArticuloInventario
+    from benchmarks.common import user_headers
+
+    with TestClient(app) as client:
+        with Session(engine) as db:
+            articulos = [
+                ArticuloInventario(nombre=f"Artículo {n}", cantidad=10**9, precio=1.5)
+                for n in range(max(LINE_COUNTS))
+            ]
+            db.add_all(articulos)
+            db.commit()
+            articulo_ids = [articulo.id for articulo in articulos]
+        headers = user_headers("checkout@bench.local", "cliente")
+        usuario_id = client.get("/api/v1/users/me", headers=headers).json()["id"]
+
+        def checkout(lines: int):
+            lineas = [{"articulo_id": articulo_id, "cantidad": 1} for articulo_id in articulo_ids[:lines]]
+
+            def run():
+                response = client.post("/api/v1/orders/checkout", json={"lineas": lineas}, headers=headers)
+                assert response.status_code == 201
+            return run
+
+        def one_by_one(lines: int):
+            def run():
+                pedido = {"usuario_id": usuario_id, "total": 0}
+                pedido_id = client.post("/api/v1/orders/", json=pedido, headers=headers).json()["id"]
+                for articulo_id in articulo_ids[:lines]:
+                    linea = {"pedido_id": pedido_id, "articulo_id": articulo_id, "cantidad": 1, "precio_unitario": 1.5}
+                    response = client.post(f"/api/v1/orders/{pedido_id}/articulos", json=linea, headers=headers)
+                    assert response.status_code == 200
+            return run
+
+        table = []
+        for lines in LINE_COUNTS:
+            old = summary_ms(timings(one_by_one(lines), args.repeat))
+            new = summary_ms(timings(checkout(lines), args.repeat))
+            table.append((lines, 1 + lines, old["p50_ms"], old["p95_ms"], new["p50_ms"], new["p95_ms"]))
+
+    print(f"Median and p95 of {args.repeat} orders")
+    print_table(
+        ("lines", "one by one requests", "one by one p50 ms", "p95 ms", "checkout p50 ms", "p95 ms"),
+        table,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Helpers shared by the benchmark scripts.
+
+Settings are read when `app` is first imported, so every script calls
+`use_scratch_environment()` before importing anything from it. The scripts
+then drive the app in-process through a TestClient against a scratch SQLite
+database, never `app/db/inventario.db`.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Sequence
+
+
+def use_scratch_environment(**settings) -> str:
+    """
+    Point the app at a new scratch directory
+
+    Args:
+        settings: Extra settings, passed as environment variables
+
+    Returns:
+        str: The scratch directory
+    """
+    scratch = tempfile.mkdtemp(prefix="techstore-bench-")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    os.environ["STATIC_PATH"] = os.path.join(scratch, "static")
+    os.environ["IMAGE_CACHE_PATH"] = os.path.join(scratch, "cache", "images")
+    os.environ["PROFILE_PATH"] = os.path.join(scratch, "cache", "profiles")
+    for name, value in settings.items():
+        os.environ[name] = str(value)
+    return scratch
+
+
+def run_variant(module: str, *arguments: object) -> List[str]:
+    """
+    Run `python -m module *arguments` in a new process, for settings that
+    only take effect when `app` is imported
+
+    Returns:
+        list: The fields of the last line it printed
+    """
+    output = subprocess.run(
+        [sys.executable, "-m", module, *map(str, arguments)], check=True, capture_output=True, text=True
+    ).stdout
+    return output.strip().splitlines()[-1].split()
+
+
+def user_headers(email: str, rol: str, password: str = "secret") -> Dict[str, str]:
+    """Create a user and return the Authorization header of its token"""
+    from sqlmodel import Session
+
+    from app.api.v1.deps import create_access_token
+    from app.core.security import get_password_hash
+    from app.db.session import engine
+    from app.models.db_models import Usuario
+
+    with Session(engine) as session:
+        user = Usuario(email=email, nombre=rol.title(), password_hash=get_password_hash(password), rol=rol)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return {"Authorization": "Bearer " + create_access_token({"sub": user.email, "user_id": user.id})}
+
+
+def timings(run: Callable[[], object], repeat: int, warmup: int = 3) -> List[float]:
+    """Seconds taken by each of `repeat` calls to `run`, after `warmup` untimed ones"""
+    for _ in range(warmup):
+        run()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def summary_ms(seconds: Sequence[float]) -> Dict[str, float]:
+    """Median, p95 and max of `seconds`, in milliseconds"""
+    ordered = sorted(seconds)
+    return {
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))] * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def print_table(columns: Sequence[str], rows: Iterable[Sequence[object]]) -> None:
+    """Print `rows` aligned under `columns`; floats get two decimals"""
+    cells = [[f"{value:.2f}" if isinstance(value, float) else str(value) for value in row] for row in rows]
+    widths = [max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in cells:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
@@ -0,0 +1,76 @@
+"""
+Bytes saved and CPU cost of response compression by body size (user-019).
+
+Fetches product list pages of increasing size uncompressed, then compresses
+each body with the middleware's gzip and brotli settings and reports the
+compressed size and the CPU time per response.
+
+    python -m benchmarks.compression [--repeat 50]
+"""
+import argparse
+import time
+from typing import Tuple
+
+from benchmarks.common import print_table, use_scratch_environment
+
+PAGE_SIZES = (5, 25, 100, 500, 2000)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    use_scratch_environment()
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app.core.compression import _Compressor, brotli
+    from app.core.config import settings
+    from app.db.session import engine
+    from app.main import app
+    from app.models.db_models import ArticuloInventario
+
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+
+    def cpu_micros(body: bytes, encoding: str) -> Tuple[float, int]:
+        start = time.process_time()
+        for _ in range(args.repeat):
+            compressor = _Compressor(encoding, settings.COMPRESSION_GZIP_LEVEL, settings.COMPRESSION_BROTLI_QUALITY)
+            compressed = compressor.compress(body, final=True)
+        return (time.process_time() - start) / args.repeat * 1_000_000, len(compressed)
+
+    with TestClient(app) as client:
+        with Session(engine) as db:
+            db.add_all(
+                ArticuloInventario(
+                    nombre=f"Portátil modelo {n}",
+                    descripcion=f"Equipo de la gama {n % 7} con garantía de dos años y envío gratuito",
+                    cantidad=n % 40,
+                    precio=199.0 + n % 900,
+                    image_url=f"/static/uploads/{n:08x}.webp",
+                )
+                for n in range(max(PAGE_SIZES))
+            )
+            db.commit()
+
+        table = []
+        for limit in PAGE_SIZES:
+            response = client.get("/api/v1/products/", params={"limit": limit}, headers={"Accept-Encoding": "identity"})
+            body = response.content
+            row = [limit, len(body)]
+            for encoding in encodings:
+                micros, size = cpu_micros(body, encoding)
+                row += [size, f"{100 * (1 - size / len(body)):.0f}%", micros]
+            table.append(row)
+
+    columns = ["products", "json bytes"]
+    for encoding in encodings:
+        columns += [f"{encoding} bytes", "saved", f"{encoding} cpu µs"]
+    print(f"CPU time is the mean of {args.repeat} compressions; bodies under {settings.COMPRESSION_MINIMUM_SIZE} bytes are sent as is")
+    print_table(columns, table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Cold and warm latency of GET /static/img/{path} (user-017).
+
+Renders a 2400x1600 JPEG at `--renders` different widths (cold: the variant
+is rendered and written to the cache) and then asks for each again (warm:
+served from the disk cache). The very first request also starts the worker
+pool and is reported on its own.
+
+    python -m benchmarks.image_resize [--renders 20] [--fmt webp]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import print_table, summary_ms, use_scratch_environment
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renders", type=int, default=20)
+    parser.add_argument("--fmt", choices=("webp", "jpeg", "png"), default="webp")
+    args = parser.parse_args()
+
+    scratch = use_scratch_environment()
+
+    from fastapi.testclient import TestClient
+    from PIL import Image
+
+    from app.main import app
+
+    static_path = os.path.join(scratch, "static")
+    os.makedirs(static_path, exist_ok=True)
+    image = Image.linear_gradient("L").resize((2400, 1600)).convert("RGB")
+    image.save(os.path.join(static_path, "producto.jpg"), quality=90)
+
+    with TestClient(app) as client:
+        def get(width: int) -> float:
+            start = time.perf_counter()
+            response = client.get("/static/img/producto.jpg", params={"w": width, "fmt": args.fmt})
+            elapsed = time.perf_counter() - start
+            assert response.status_code == 200
+            return elapsed
+
+        first = get(1200)
+        widths = [200 + 40 * n for n in range(args.renders)]
+        cold = [get(width) for width in widths]
+        warm = [get(width) for width in widths for _ in range(5)]
+
+        # Concurrent requests for one new variant share a single render
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            list(executor.map(lambda _: get(1000), range(10)))
+        coalesced = time.perf_counter() - start
+
+    cold_ms, warm_ms = summary_ms(cold), summary_ms(warm)
+    print(f"2400x1600 JPEG to {args.fmt}, {args.renders} widths")
+    print_table(
+        ("request", "p50 ms", "p95 ms", "max ms"),
+        [
+            ("first (starts the workers)", first * 1000, first * 1000, first * 1000),
+            ("cold render", cold_ms["p50_ms"], cold_ms["p95_ms"], cold_ms["max_ms"]),
+            ("warm (disk cache)", warm_ms["p50_ms"], warm_ms["p95_ms"], warm_ms["max_ms"]),
+            ("10 concurrent, one variant", coalesced * 1000, coalesced * 1000, coalesced * 1000),
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Product list serialization: ORM objects and Pydantic against plain rows and
+orjson (user-020).
+
+Times, for pages of `--limit` products:
+- the serialization alone: ORM objects validated into ArticuloRead and
+  encoded with jsonable_encoder + json (the path before FAST_LIST_RESPONSES),
+  against selected columns turned into dicts and encoded with orjson
+- whole GET /api/v1/products requests with FAST_LIST_RESPONSES off and on
+
+The catalog cache is disabled so every request reaches the database.
+
+    python -m benchmarks.list_serialization [--limit 100] [--repeat 200]
+"""
+import argparse
+import json
+
+from benchmarks.common import print_table, summary_ms, timings, use_scratch_environment
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    use_scratch_environment(CATALOG_CACHE_TTL=0)
+
+    import orjson
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session, select
+
+    from app.api.v1.endpoints.articulos import _READ_COLUMNS
+    from app.core.config import settings
+    from app.db.session import engine
+    from app.main import app
+    from app.models.db_models import ArticuloInventario, ArticuloRead
+    from app.services.fast_json import rows_to_dicts
+
+    with TestClient(app) as client:
+        with Session(engine) as db:
+            db.add_all(
+                ArticuloInventario(
+                    nombre=f"Monitor {n}",
+                    descripcion="Panel IPS de 27 pulgadas",
+                    cantidad=n % 30,
+                    precio=149.0 + n,
+                    image_variants={"thumb": {"width": 160, "webp": f"/static/variants/{n}-160.webp"}},
+                )
+                for n in range(args.limit)
+            )
+            db.commit()
+
+        with Session(engine) as db:
+            def orm_and_pydantic():
+                articulos = db.exec(select(ArticuloInventario).limit(args.limit)).all()
+                leidos = []
+                for articulo in articulos:
+                    leido = ArticuloRead.from_orm(articulo)
+                    leido.image_url = leido.image_url or articulo.fallback_image_url
+                    leidos.append(leido)
+                return json.dumps(jsonable_encoder(leidos))
+
+            def rows_and_orjson():
+                return orjson.dumps(rows_to_dicts(db.execute(select(*_READ_COLUMNS).limit(args.limit)).all()))
+
+            assert json.loads(orm_and_pydantic()) == json.loads(rows_and_orjson())
+            table = [
+                ("ORM + Pydantic + json", *summary_ms(timings(orm_and_pydantic, args.repeat)).values()),
+                ("rows + orjson", *summary_ms(timings(rows_and_orjson, args.repeat)).values()),
+            ]
+
+        def request():
+            response = client.get("/api/v1/products/", params={"limit": args.limit})
+            assert response.status_code == 200
+        for fast in (False, True):
+            settings.FAST_LIST_RESPONSES = fast
+            label = f"GET, FAST_LIST_RESPONSES={str(fast).lower()}"
+            table.append((label, *summary_ms(timings(request, args.repeat)).values()))
+
+    print(f"{args.limit} products per page, {args.repeat} runs each")
+    print_table(("path", "p50 ms", "p95 ms", "max ms"), table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Login throughput under mixed traffic (user-004).
+
+Reader threads page through GET /api/v1/products, first alone and then while
+login threads post to /api/v1/auth/login/access-token. bcrypt runs either on
+the anyio worker threads (PASSWORD_HASH_WORKERS=0, as before the process
+pool) or in the process pool, each in its own process.
+
+    python -m benchmarks.login_throughput [--seconds 5] [--readers 4] [--logins 16] [--workers N]
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.common import print_table, run_variant, summary_ms, use_scratch_environment
+
+ARTICULOS = 1000
+
+
+def run_workers(workers: int, seconds: float, readers: int, logins: int) -> None:
+    use_scratch_environment(PASSWORD_HASH_WORKERS=workers)
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app.db.session import engine
+    from app.main import app
+    from app.models.db_models import ArticuloInventario
+    from benchmarks.common import user_headers
+
+    with TestClient(app) as client:
+        with Session(engine) as db:
+            db.add_all(ArticuloInventario(nombre=f"Artículo {n}", cantidad=10, precio=5.0) for n in range(ARTICULOS))
+            db.commit()
+        user_headers("login@bench.local", "cliente", password="contraseña")
+        credentials = {"username": "login@bench.local", "password": "contraseña"}
+
+        def phase(login_threads: int) -> Dict[str, object]:
+            stop = threading.Event()
+            read_seconds: List[float] = []
+            statuses: List[int] = []
+
+            def reader() -> None:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    client.get("/api/v1/products/", params={"skip": random.randrange(ARTICULOS - 50), "limit": 50})
+                    read_seconds.append(time.perf_counter() - start)
+
+            def login() -> None:
+                while not stop.is_set():
+                    statuses.append(client.post("/api/v1/auth/login/access-token", data=credentials).status_code)
+
+            threads = [threading.Thread(target=reader) for _ in range(readers)]
+            threads += [threading.Thread(target=login) for _ in range(login_threads)]
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            return {
+                "reads": len(read_seconds) / seconds,
+                "read_p95_ms": summary_ms(read_seconds)["p95_ms"],
+                "logins": statuses.count(200) / seconds,
+                "rejected": statuses.count(503),
+            }
+
+        # Starts the worker processes, so the first phase does not pay for it
+        client.post("/api/v1/auth/login/access-token", data=credentials)
+        alone = phase(0)
+        mixed = phase(logins)
+
+    print(
+        f"{workers} {alone['reads']:.1f} {alone['read_p95_ms']:.1f} {mixed['reads']:.1f} "
+        f"{mixed['read_p95_ms']:.1f} {mixed['logins']:.1f} {mixed['rejected']}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--logins", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2), help="Process pool size")
+    parser.add_argument("--run-workers", type=int, help="Run one pool size in this process")
+    args = parser.parse_args()
+
+    if args.run_workers is not None:
+        run_workers(args.run_workers, args.seconds, args.readers, args.logins)
+        return
+
+    rows = []
+    for workers in (0, args.workers):
+        fields = run_variant(
+            "benchmarks.login_throughput", "--run-workers", workers,
+            "--seconds", args.seconds, "--readers", args.readers, "--logins", args.logins,
+        )
+        label = "threadpool" if workers == 0 else f"{workers} processes"
+        rows.append((label, *map(float, fields[1:6]), int(fields[6])))
+    print(f"{args.readers} catalog readers, {args.logins} login threads, {args.seconds:g}s per phase")
+    print_table(
+        ("bcrypt on", "reads/s alone", "p95 ms alone", "reads/s mixed", "p95 ms mixed", "logins/s", "503s"),
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Cost of a deep page with skip/limit and with a cursor (user-005).
+
+Seeds enough products and orders for `--pages` pages of `--limit` rows and
+times page 1 and the last page of GET /api/v1/products and GET
+/api/v1/orders, once with `skip` and once with the cursor of the previous
+page. The catalog cache is disabled so every request reaches the database.
+
+    python -m benchmarks.pagination_depth [--pages 10000] [--limit 20] [--repeat 30]
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import print_table, summary_ms, timings, use_scratch_environment
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    use_scratch_environment(CATALOG_CACHE_TTL=0)
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import select
+
+    from app.db.session import engine
+    from app.main import app
+    from app.models.db_models import ArticuloInventario, Pedido
+    from app.services.pagination import encode_cursor
+    from benchmarks.common import user_headers
+
+    rows = args.pages * args.limit
+    skip = (args.pages - 1) * args.limit
+    with TestClient(app) as client:
+        headers = user_headers("paginas@bench.local", "admin")
+        inicio = datetime(2020, 1, 1)
+        with engine.begin() as conn:
+            conn.execute(
+                ArticuloInventario.__table__.insert(),
+                [{"nombre": f"Artículo {n}", "cantidad": 1, "precio": 2.5} for n in range(rows)],
+            )
+            conn.execute(
+                Pedido.__table__.insert(),
+                [
+                    {"usuario_id": 1, "total": 2.5, "estado": "pagado", "fecha_pedido": inicio + timedelta(minutes=n)}
+                    for n in range(rows)
+                ],
+            )
+            # The last row of the page before the deep one, as its X-Next-Cursor would carry it
+            articulo_id = conn.execute(
+                select(ArticuloInventario.id).order_by(ArticuloInventario.id).offset(skip - 1).limit(1)
+            ).scalar_one()
+            pedido = conn.execute(
+                select(Pedido.fecha_pedido, Pedido.id)
+                .order_by(Pedido.fecha_pedido.desc(), Pedido.id.desc())
+                .offset(skip - 1)
+                .limit(1)
+            ).one()
+
+        def timed(path, **params):
+            def run():
+                response = client.get(path, params={"limit": args.limit, **params}, headers=headers)
+                assert response.status_code == 200 and len(response.json()) == args.limit
+            return summary_ms(timings(run, args.repeat))["p50_ms"]
+
+        table = []
+        for path, cursor in (
+            ("/api/v1/products/", encode_cursor(articulo_id)),
+            ("/api/v1/orders/", encode_cursor(*pedido)),
+        ):
+            first = timed(path, skip=0)
+            table.append((path, "skip", first, timed(path, skip=skip)))
+            table.append((path, "cursor", first, timed(path, cursor=cursor)))
+
+    print(f"{rows} rows per table, {args.limit} per page, median of {args.repeat} requests")
+    print_table(("endpoint", "paging", "page 1 ms", f"page {args.pages} ms"), table)
+
+
+if __name__ == "__main__":
+    main()
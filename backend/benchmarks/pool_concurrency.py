@@ -0,0 +1,98 @@
+"""
+Catalog read throughput while orders are being written (user-001).
+
+Reader threads page through GET /api/v1/products while writer threads post
+checkouts, for each DB_POOL_MODE. Every mode runs in its own process, since
+the engine is built when `app` is imported.
+
+    python -m benchmarks.pool_concurrency [--seconds 5] [--readers 8] [--writers 2]
+"""
+import argparse
+import random
+import threading
+import time
+
+from benchmarks.common import print_table, run_variant, use_scratch_environment
+
+POOL_MODES = ("static", "queue")
+ARTICULOS = 2000
+
+
+def run_mode(pool_mode: str, seconds: float, readers: int, writers: int) -> None:
+    use_scratch_environment(DB_POOL_MODE=pool_mode, SQLITE_WAL=pool_mode != "static")
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app.db.session import engine
+    from app.main import app
+    from app.models.db_models import ArticuloInventario
+    from benchmarks.common import user_headers
+
+    with TestClient(app) as client:
+        with Session(engine) as db:
+            db.add_all(
+                ArticuloInventario(nombre=f"Artículo {n}", cantidad=10**9, precio=1.0 + n % 50)
+                for n in range(ARTICULOS)
+            )
+            db.commit()
+        headers = user_headers("bench@bench.local", "cliente")
+
+        stop = threading.Event()
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+
+        def count(name: str, ok: bool) -> None:
+            with lock:
+                counts[name if ok else "errors"] += 1
+
+        def reader() -> None:
+            while not stop.is_set():
+                # Random pages, so the catalog cache does not answer every read
+                skip = random.randrange(0, ARTICULOS - 50)
+                response = client.get("/api/v1/products/", params={"skip": skip, "limit": 50})
+                count("reads", response.status_code == 200)
+
+        def writer() -> None:
+            while not stop.is_set():
+                lineas = [{"articulo_id": random.randrange(1, ARTICULOS + 1), "cantidad": 1} for _ in range(5)]
+                response = client.post("/api/v1/orders/checkout", json={"lineas": lineas}, headers=headers)
+                count("writes", response.status_code == 201)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    print(f"{pool_mode} {counts['reads'] / seconds:.1f} {counts['writes'] / seconds:.1f} {counts['errors']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--pool-mode", choices=POOL_MODES, help="Run one mode in this process")
+    args = parser.parse_args()
+
+    if args.pool_mode:
+        run_mode(args.pool_mode, args.seconds, args.readers, args.writers)
+        return
+
+    rows = []
+    for pool_mode in POOL_MODES:
+        mode, reads, writes, errors = run_variant(
+            "benchmarks.pool_concurrency", "--pool-mode", pool_mode,
+            "--seconds", args.seconds, "--readers", args.readers, "--writers", args.writers,
+        )
+        rows.append((mode, float(reads), float(writes), int(errors)))
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per mode")
+    print_table(("pool mode", "reads/s", "checkouts/s", "errors"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a scratch directory
+# before anything from `app` is imported
+_scratch = tempfile.mkdtemp(prefix="techstore-tests-")
+os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ["STATIC_PATH"] = os.path.join(_scratch, "static")
+os.environ["IMAGE_CACHE_PATH"] = os.path.join(_scratch, "cache", "images")
+os.environ["PROFILE_PATH"] = os.path.join(_scratch, "cache", "profiles")
+# Responses carry X-DB-Query-Count, for query budgets (assert_response_queries)
+os.environ["DEBUG"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.api.v1.deps import create_access_token
+from app.core.security import get_password_hash
+from app.db.session import engine
+from app.main import app
+from app.models.db_models import Usuario
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    with Session(engine) as session:
+        yield session
+
+
+def _user_headers(email: str, rol: str):
+    with Session(engine) as session:
+        user = Usuario(email=email, nombre=rol.title(), password_hash=get_password_hash("secret"), rol=rol)
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        return {"Authorization": "Bearer " + create_access_token({"sub": user.email, "user_id": user.id})}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return _user_headers("admin@tests.local", "admin")
+
+
+@pytest.fixture(scope="session")
+def client_headers(client):
+    return _user_headers("cliente@tests.local", "cliente")
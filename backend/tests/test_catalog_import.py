@@ -0,0 +1,51 @@
+import io
+
+from app.services import catalog_import
+from app.services.catalog_import import iter_csv_rows, iter_ndjson_rows
+
+
+class _ReadOnlyUpload:
+    """Like SpooledTemporaryFile before Python 3.11: read() but no readable()"""
+
+    def __init__(self, content: bytes):
+        self._buffer = io.BytesIO(content)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(size)
+
+
+def test_csv_rows_decode_without_text_wrapper(monkeypatch):
+    # Tiny reads split the BOM and the multi-byte characters across chunks
+    monkeypatch.setattr(catalog_import, "READ_SIZE", 3)
+    content = '\ufeffnombre,descripcion\r\nCañón,"Dos\r\nlíneas"\r\nÑandú,\r\n'.encode()
+    rows = list(iter_csv_rows(_ReadOnlyUpload(content)))
+    assert [row["nombre"] for _, row in rows] == ["Cañón", "Ñandú"]
+    assert rows[0][1]["descripcion"] == "Dos\r\nlíneas"
+    assert [line_num for line_num, _ in rows] == [3, 4]
+
+
+def test_ndjson_rows_decode_without_text_wrapper():
+    content = '{"nombre": "Café"}\n\nno es json\n{"nombre": "Té"}'.encode()
+    rows = list(iter_ndjson_rows(_ReadOnlyUpload(content)))
+    assert rows[0] == (1, {"nombre": "Café"})
+    assert isinstance(rows[1][1], ValueError) and rows[1][0] == 3
+    assert rows[2] == (4, {"nombre": "Té"})
+
+
+def test_failed_row_does_not_fail_its_chunk(client, admin_headers):
+    content = (
+        "nombre,cantidad,precio,sku\n"
+        "Importado con sku,1,2.0,SKU-REPETIDO\n"
+        "Importado bueno 1,1,2.0,\n"
+        "Importado repite sku,1,2.0,SKU-REPETIDO\n"
+        "Importado bueno 2,1,2.0,\n"
+    )
+    response = client.post(
+        "/api/v1/products/import",
+        files={"file": ("precios.csv", content.encode(), "text/csv")},
+        headers=admin_headers,
+    )
+    assert response.status_code == 200
+    resultado = response.json()
+    assert resultado["insertados"] == 3
+    assert [error["fila"] for error in resultado["errores"]] == [4]
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from app.models.db_models import ArticuloInventario
+from app.services.pagination import encode_cursor
+
+PRODUCTS = "/api/v1/products/"
+
+
+def _create(client, nombre):
+    response = client.post(PRODUCTS, json={"nombre": nombre, "cantidad": 1, "precio": 1.0})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+@pytest.fixture(autouse=True)
+def updated_product(client):
+    # With an updated product max(fecha_actualizacion) exists, so a list
+    # Last-Modified would be sent; it must not survive creates and deletes
+    articulo_id = _create(client, "Validador actualizado")
+    assert client.put(f"{PRODUCTS}{articulo_id}", json={"cantidad": 2}).status_code == 200
+
+
+def _future_date():
+    return format_datetime(datetime.now(timezone.utc) + timedelta(days=1), usegmt=True)
+
+
+def test_list_has_no_last_modified(client):
+    _create(client, "Validador lista")
+    response = client.get(PRODUCTS)
+    assert response.status_code == 200
+    assert "etag" in response.headers
+    assert "last-modified" not in response.headers
+
+
+def test_list_changes_after_create(client):
+    before = client.get(PRODUCTS, params={"limit": 1000})
+    nuevo = _create(client, "Validador creado")
+
+    for headers in ({"If-None-Match": before.headers["etag"]}, {"If-Modified-Since": _future_date()}):
+        response = client.get(PRODUCTS, params={"limit": 1000}, headers=headers)
+        assert response.status_code == 200
+        assert nuevo in [articulo["id"] for articulo in response.json()]
+
+
+def test_list_changes_after_delete(client):
+    borrado = _create(client, "Validador borrado")
+    before = client.get(PRODUCTS, params={"limit": 1000})
+    assert client.delete(f"{PRODUCTS}{borrado}").status_code == 204
+
+    for headers in ({"If-None-Match": before.headers["etag"]}, {"If-Modified-Since": _future_date()}):
+        response = client.get(PRODUCTS, params={"limit": 1000}, headers=headers)
+        assert response.status_code == 200
+        assert borrado not in [articulo["id"] for articulo in response.json()]
+
+
+def test_unchanged_list_is_not_modified(client):
+    _create(client, "Validador estable")
+    etag = client.get(PRODUCTS).headers["etag"]
+    assert client.get(PRODUCTS, headers={"If-None-Match": etag}).status_code == 304
+
+
+def _write_from_another_worker(db, articulo_id, precio):
+    # Straight to the database: this process's cache is not invalidated
+    articulo = db.get(ArticuloInventario, articulo_id)
+    articulo.precio = precio
+    articulo.fecha_actualizacion = datetime.utcnow()
+    db.commit()
+
+
+def test_item_cache_follows_writes_from_other_workers(client, db):
+    articulo_id = _create(client, "Validador otro worker")
+    assert client.get(f"{PRODUCTS}{articulo_id}").json()["precio"] == 1.0
+
+    _write_from_another_worker(db, articulo_id, 7.5)
+    response = client.get(f"{PRODUCTS}{articulo_id}")
+    assert response.json()["precio"] == 7.5
+
+
+def test_list_cache_follows_writes_from_other_workers(client, db):
+    articulo_id = _create(client, "Validador lista otro worker")
+    params = {"cursor": encode_cursor(articulo_id - 1), "limit": 1}
+    assert client.get(PRODUCTS, params=params).json()[0]["precio"] == 1.0
+
+    _write_from_another_worker(db, articulo_id, 9.25)
+    assert client.get(PRODUCTS, params=params).json()[0]["precio"] == 9.25
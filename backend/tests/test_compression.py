@@ -0,0 +1,17 @@
+import pytest
+
+from app.core.compression import accepted_encodings
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate, br", {"gzip", "deflate", "br"}),
+        ("GZIP;q=0.5, br ; q=1", {"gzip", "br"}),
+        ("br;q=0, gzip;Q=0.000, identity", {"identity"}),
+        ("br;q=0.001, gzip;q=nope", {"br"}),
+        ("", set()),
+    ],
+)
+def test_accepted_encodings(header, expected):
+    assert accepted_encodings(header) == expected
@@ -0,0 +1,63 @@
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.v1.endpoints.pedidos import _iter_export_csv, _iter_export_ndjson, _iter_export_rows
+from app.db.session import engine
+from app.models.db_models import ArticuloInventario
+
+PEDIDOS = 20000
+# Pedidos seeded in their own window, so other tests' orders stay out of the export
+DESDE = datetime(2001, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def exportados(client):
+    with engine.begin() as conn:
+        articulo_ids = []
+        for nombre in ("Exportado A", "Exportado B"):
+            result = conn.execute(
+                ArticuloInventario.__table__.insert().values(nombre=nombre, cantidad=0, precio=4.25)
+            )
+            articulo_ids.append(result.inserted_primary_key[0])
+        primero = conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) + 1 FROM pedidos").scalar()
+        conn.exec_driver_sql(
+            "INSERT INTO pedidos (id, usuario_id, total, estado, fecha_pedido, direccion_envio) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (primero + n, 1, 8.5, "pagado", DESDE + timedelta(seconds=n), f"Calle de la exportación {n}")
+                for n in range(PEDIDOS)
+            ],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO pedido_articulos (pedido_id, articulo_id, cantidad, precio_unitario) VALUES (?, ?, ?, ?)",
+            [(primero + n, articulo_id, 1, 4.25) for n in range(PEDIDOS) for articulo_id in articulo_ids],
+        )
+    return DESDE, DESDE + timedelta(seconds=PEDIDOS)
+
+
+@pytest.mark.parametrize("formato", [_iter_export_ndjson, _iter_export_csv])
+def test_export_memory_stays_bounded(exportados, formato):
+    desde, hasta = exportados
+    tracemalloc.start()
+    try:
+        exported = 0
+        for chunk in formato(_iter_export_rows(desde, hasta)):
+            exported += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert exported > 3 * 2**20
+    # Batches of rows plus one output chunk, whatever the size of the export
+    assert peak < 4 * 2**20
+
+
+def test_export_streams_every_order(client, admin_headers, exportados):
+    desde, hasta = exportados
+    params = {"desde": desde.isoformat(), "hasta": (desde + timedelta(seconds=3)).isoformat()}
+    response = client.get("/api/v1/orders/export", params=params, headers=admin_headers)
+    assert response.status_code == 200
+    pedidos = response.text.splitlines()
+    assert len(pedidos) == 3
+    assert '"articulos": [{' in pedidos[0]
@@ -0,0 +1,46 @@
+import threading
+
+from PIL import Image
+
+from app.db.session import engine
+from app.services.image_io import to_jpeg_mode
+from app.services.image_variants import ImageVariantGenerator
+
+
+def test_cleared_variants_are_stored_as_sql_null(client):
+    articulo_id = client.post(
+        "/api/v1/products/", json={"nombre": "Variantes nulas", "cantidad": 1, "precio": 1.0}
+    ).json()["id"]
+    assert client.put(f"/api/v1/products/{articulo_id}", json={"image_url": "https://example.com/otra.png"}).status_code == 200
+
+    with engine.connect() as conn:
+        stored = conn.exec_driver_sql(
+            "SELECT image_variants IS NULL FROM articulos_inventario WHERE id = ?", (articulo_id,)
+        ).scalar_one()
+    assert stored == 1
+
+
+def test_renders_run_in_parallel(monkeypatch):
+    generator = ImageVariantGenerator(widths={"thumb": 16}, quality=80, workers=2)
+    # Both renders must be running at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def render(source_path):
+        barrier.wait()
+        return {}
+
+    monkeypatch.setattr(generator, "render", render)
+    try:
+        futures = [generator.submit_file(f"/tmp/{name}.png") for name in ("a", "b")]
+        assert [future.result(timeout=10) for future in futures] == [{}, {}]
+    finally:
+        generator.shutdown()
+
+
+def test_transparent_images_are_flattened_onto_white_for_jpeg():
+    transparent = Image.new("RGBA", (4, 4), (0, 0, 0, 0))
+    assert to_jpeg_mode(transparent).getpixel((0, 0)) == (255, 255, 255)
+
+    palette = Image.new("P", (4, 4), 0)
+    palette.info["transparency"] = 0
+    assert to_jpeg_mode(palette).getpixel((0, 0)) == (255, 255, 255)
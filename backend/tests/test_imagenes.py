@@ -0,0 +1,42 @@
+import os
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+
+
+def _imagen(nombre):
+    os.makedirs(settings.STATIC_PATH, exist_ok=True)
+    Image.new("RGB", (64, 48), "teal").save(os.path.join(settings.STATIC_PATH, nombre))
+
+
+@pytest.fixture(autouse=True)
+def _sin_workers(monkeypatch):
+    from app.services.image_resize import resized_image_cache
+
+    # Render in the event loop's threadpool: no worker processes for a tiny image
+    monkeypatch.setattr(resized_image_cache, "workers", 0)
+
+
+def test_unhashed_names_are_revalidated(client):
+    _imagen("foto.png")
+    response = client.get("/static/img/foto.png", params={"w": 32})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, no-cache"
+    etag = response.headers["etag"]
+
+    response = client.get("/static/img/foto.png", params={"w": 32}, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    # Another rendition of the same image is another representation
+    response = client.get("/static/img/foto.png", params={"w": 16}, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_hashed_names_are_immutable(client):
+    _imagen("3f2a1b9c7d8e6f50.png")
+    response = client.get("/static/img/3f2a1b9c7d8e6f50.png", params={"w": 32})
+    assert response.status_code == 200
+    assert "immutable" in response.headers["cache-control"]
@@ -0,0 +1,30 @@
+from app.core.config import settings
+from app.core.metrics import RequestMetrics, render_prometheus
+
+
+def test_metrics_without_token_hide_internal_stats(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_request_duration_seconds" in response.text
+    assert "techstore_" not in response.text
+
+
+def test_metrics_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer otro"}).status_code == 401
+
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
+    assert "techstore_" in response.text
+
+
+def test_latency_above_a_bound_is_not_counted_under_it():
+    metrics = RequestMetrics()
+    metrics.start("GET")
+    # 10.1 ms shares its fine bucket (9.728-10.239 ms) with values under le=0.01
+    metrics.finish("GET", "/bucket", 200, 10_100)
+    body = render_prometheus(metrics.snapshot(), [0.01, 0.025])
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/bucket",le="0.01"} 0' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/bucket",le="0.025"} 1' in body
@@ -0,0 +1,44 @@
+import pytest
+
+from app.db.query_stats import assert_max_queries, assert_response_queries
+from app.models.db_models import ArticuloInventario
+from app.services.catalog_cache import catalog_cache
+from app.services.inventory import reserve_stock_many
+
+
+@pytest.fixture
+def articulo_ids(db):
+    articulos = [ArticuloInventario(nombre=f"Presupuesto {n}", cantidad=100, precio=2.0) for n in range(30)]
+    db.add_all(articulos)
+    db.commit()
+    return [articulo.id for articulo in articulos]
+
+
+def test_catalog_list_budget(client, articulo_ids):
+    catalog_cache.clear()
+    # ETag query and page query; a cached page only needs the ETag
+    assert_response_queries(client.get("/api/v1/products/", params={"limit": 20}), 2)
+    assert_response_queries(client.get("/api/v1/products/", params={"limit": 20}), 1)
+    assert_response_queries(client.get("/api/v1/products/", params={"limit": 20, "nombre": "presupuesto"}), 2)
+
+
+def test_item_detail_budget(client, articulo_ids):
+    catalog_cache.clear()
+    assert_response_queries(client.get(f"/api/v1/products/{articulo_ids[0]}"), 2)
+    assert_response_queries(client.get(f"/api/v1/products/{articulo_ids[0]}"), 1)
+
+
+@pytest.mark.parametrize("lines", [1, 10, 30])
+def test_checkout_budget_does_not_grow_with_lines(client, client_headers, articulo_ids, lines):
+    lineas = [{"articulo_id": articulo_id, "cantidad": 1} for articulo_id in articulo_ids[:lines]]
+    response = client.post("/api/v1/orders/checkout", json={"lineas": lineas}, headers=client_headers)
+    assert response.status_code == 201
+    assert_response_queries(response, 6)
+
+
+def test_reserve_many_budget(db, articulo_ids):
+    # Runs in this thread, so the block sees the queries
+    with assert_max_queries(1) as stats:
+        assert reserve_stock_many(db, {articulo_id: 1 for articulo_id in articulo_ids}) == []
+    db.rollback()
+    assert stats.count == 1
@@ -0,0 +1,17 @@
+from app.models.db_models import ArticuloInventario
+
+
+def test_checkout_rejects_deleted_articles(client, db, client_headers):
+    articulo = ArticuloInventario(nombre="Reservado y retirado", cantidad=5, precio=3.0)
+    db.add(articulo)
+    db.commit()
+    db.refresh(articulo)
+
+    response = client.post("/api/v1/holds/", json={"articulo_id": articulo.id, "cantidad": 2}, headers=client_headers)
+    assert response.status_code == 201
+    reserva_id = response.json()["id"]
+    assert client.delete(f"/api/v1/products/{articulo.id}").status_code == 204
+
+    response = client.post("/api/v1/holds/checkout", json={"reservas": [reserva_id]}, headers=client_headers)
+    assert response.status_code == 409
+    assert str(articulo.id) in response.json()["detail"]
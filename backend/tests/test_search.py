@@ -0,0 +1,22 @@
+import pytest
+
+PRODUCTS = "/api/v1/products/"
+
+
+@pytest.fixture(autouse=True)
+def productos(client):
+    for nombre in ("Portátil gaming", "Ratón inalámbrico"):
+        assert client.post(PRODUCTS, json={"nombre": nombre, "cantidad": 1, "precio": 1.0}).status_code == 200
+
+
+def test_search_matches_word_prefixes(client):
+    nombres = [articulo["nombre"] for articulo in client.get(PRODUCTS, params={"q": "port gam"}).json()]
+    assert "Portátil gaming" in nombres
+    assert "Ratón inalámbrico" not in nombres
+
+
+@pytest.mark.parametrize("q", ["!!!", "  ", "\"*"])
+def test_search_without_words_finds_nothing(client, q):
+    response = client.get(PRODUCTS, params={"q": q})
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,63 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlmodel import Session
+
+from app.db.session import engine
+from app.models.db_models import ArticuloInventario
+from app.services.inventory import reserve_stock, reserve_stock_many
+
+
+def _articulo(db, nombre, cantidad):
+    articulo = ArticuloInventario(nombre=nombre, cantidad=cantidad, precio=9.5)
+    db.add(articulo)
+    db.commit()
+    db.refresh(articulo)
+    return articulo.id
+
+
+def test_parallel_orders_never_oversell(db):
+    stock, orders = 50, 200
+    articulo_id = _articulo(db, "Stock concurrente", stock)
+    start_together = threading.Barrier(orders)
+
+    def order(_):
+        start_together.wait()
+        with Session(engine) as session:
+            reserved = reserve_stock(session, articulo_id, 1)
+            session.commit()
+            return reserved
+
+    with ThreadPoolExecutor(max_workers=orders) as executor:
+        results = list(executor.map(order, range(orders)))
+
+    db.expire_all()
+    assert results.count(True) == stock
+    assert db.get(ArticuloInventario, articulo_id).cantidad == 0
+
+
+def test_reserve_many_reports_short_articles(db):
+    con_stock = _articulo(db, "Con stock", 5)
+    sin_stock = _articulo(db, "Sin stock", 1)
+
+    assert reserve_stock_many(db, {con_stock: 2, sin_stock: 3, 999999: 1}) == [sin_stock, 999999]
+    db.rollback()
+    assert reserve_stock_many(db, {con_stock: 2, sin_stock: 1}) == []
+    db.commit()
+
+    db.expire_all()
+    assert db.get(ArticuloInventario, con_stock).cantidad == 3
+    assert db.get(ArticuloInventario, sin_stock).cantidad == 0
+
+
+def test_checkout_reserves_in_one_statement(client, db, client_headers, caplog):
+    ids = [_articulo(db, f"Línea {i}", 10) for i in range(6)]
+    with caplog.at_level(logging.WARNING, logger="app.db.query_stats"):
+        response = client.post(
+            "/api/v1/orders/checkout",
+            json={"lineas": [{"articulo_id": articulo_id, "cantidad": 1} for articulo_id in ids]},
+            headers=client_headers,
+        )
+    assert response.status_code == 201, response.text
+    assert "Possible N+1" not in caplog.text
@@ -0,0 +1,75 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from PIL import Image
+from sqlalchemy import update
+
+from app.models.db_models import ArchivoSubido, ArticuloInventario
+from app.services import file_upload
+from app.services.image_variants import image_variant_generator, url_to_path
+from app.services.upload_store import upload_garbage_collector
+
+
+def _png(color):
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 24), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def _sin_variantes(monkeypatch):
+    monkeypatch.setattr(image_variant_generator, "submit_articulo", lambda articulo_id, image_url: None)
+
+
+@pytest.fixture
+def articulo_id(db):
+    articulo = ArticuloInventario(nombre="Con imagen", cantidad=1, precio=1.0)
+    db.add(articulo)
+    db.commit()
+    return articulo.id
+
+
+def _subir(client, articulo_id, contenido):
+    return client.post(
+        f"/api/v1/products/{articulo_id}/upload-image",
+        files={"file": ("foto.png", contenido, "application/octet-stream")},
+    )
+
+
+def test_upload_is_registered_and_referenced(client, db, articulo_id):
+    response = _subir(client, articulo_id, _png("navy"))
+    assert response.status_code == 200
+    image_url = response.json()["image_url"]
+    assert os.path.exists(url_to_path(image_url))
+
+    archivo = db.query(ArchivoSubido).filter(ArchivoSubido.ruta == image_url).one()
+    assert archivo.referencias == 1
+
+
+def test_reused_file_is_not_collected_while_uploading(client, db, articulo_id, monkeypatch):
+    contenido = _png("olive")
+    image_url = _subir(client, articulo_id, contenido).json()["image_url"]
+    path = url_to_path(image_url)
+
+    # The article moves on: the file is unreferenced and past the grace period
+    assert _subir(client, articulo_id, _png("maroon")).status_code == 200
+    antes = datetime.utcnow() - upload_garbage_collector.grace - timedelta(minutes=1)
+    db.execute(update(ArchivoSubido).where(ArchivoSubido.ruta == image_url).values(fecha_ultimo_uso=antes))
+    db.commit()
+    os.utime(path, (antes.timestamp(), antes.timestamp()))
+
+    store_by_hash = file_upload._store_by_hash
+
+    def collect_then_store(*args):
+        # A collection that runs right before the identical file is reused
+        upload_garbage_collector.collect()
+        assert os.path.exists(path)
+        return store_by_hash(*args)
+
+    monkeypatch.setattr(file_upload, "_store_by_hash", collect_then_store)
+    response = _subir(client, articulo_id, contenido)
+    assert response.status_code == 200
+    assert response.json()["image_url"] == image_url
+    assert os.path.exists(path)
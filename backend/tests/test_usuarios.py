@@ -0,0 +1,14 @@
+from app.services.password_hashing import password_hasher
+
+
+def test_update_missing_user_does_not_hash(client, admin_headers, monkeypatch):
+    hashed = []
+
+    async def hash(password):
+        hashed.append(password)
+        return "hash"
+
+    monkeypatch.setattr(password_hasher, "hash", hash)
+    response = client.put("/api/v1/users/999999", json={"password": "nueva"}, headers=admin_headers)
+    assert response.status_code == 404
+    assert hashed == []